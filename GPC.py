@@ -1,15 +1,21 @@
-import os
 import hashlib
 import random
 from gmssl import sm3
 
+from bigint_backend import mpz, powmod, invert
+from sm2_ladder import ladder, ladder_x, encode_x, decode_x
+from gpc_hash import hash_to_curve_many
+from gpc_fingerprint import FingerprintSet
+from gpc_paillier import generate_primes
+from sm3_drbg import randbelow
+
 # 椭圆曲线参数 (NIST标准)
-p = 0xFFFFFFFEFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF00000000FFFFFFFFFFFFFFFF
-a = 0xFFFFFFFEFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF00000000FFFFFFFFFFFFFFFC
-b = 0x28E9FA9E9D9F5E344D5A9E4BCF6509A7F39789F515AB8F92DDBCBD414D940E93
-n = 0xFFFFFFFEFFFFFFFFFFFFFFFFFFFFFFFF7203DF6B21C6052B53BBF40939D54123
-Gx = 0x32C4AE2C1F1981195F9904466A39C9948FE30BBFF2660BE1715A4589334C74C7
-Gy = 0xBC3736A2F4F6779C59BDCEE36B692153D0A9877CC62A474002DF32E52139F0A0
+p = mpz(0xFFFFFFFEFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF00000000FFFFFFFFFFFFFFFF)
+a = mpz(0xFFFFFFFEFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF00000000FFFFFFFFFFFFFFFC)
+b = mpz(0x28E9FA9E9D9F5E344D5A9E4BCF6509A7F39789F515AB8F92DDBCBD414D940E93)
+n = mpz(0xFFFFFFFEFFFFFFFFFFFFFFFFFFFFFFFF7203DF6B21C6052B53BBF40939D54123)
+Gx = mpz(0x32C4AE2C1F1981195F9904466A39C9948FE30BBFF2660BE1715A4589334C74C7)
+Gy = mpz(0xBC3736A2F4F6779C59BDCEE36B692153D0A9877CC62A474002DF32E52139F0A0)
 
 
 class Point:
@@ -34,14 +40,10 @@ G = Point(Gx, Gy)
 
 
 def mod_inverse(a, mod):
-    def extended_gcd(a, b):
-        if b == 0:
-            return (a, 1, 0)
-        g, x, y = extended_gcd(b, a % b)
-        return (g, y, x - (a // b) * y)
-
-    g, x, y = extended_gcd(a, mod)
-    return x % mod if g == 1 else None
+    try:
+        return invert(a, mod)
+    except ZeroDivisionError:
+        return None
 
 
 def point_add(p1, p2):
@@ -87,7 +89,7 @@ def hash_to_curve(data):
     while True:
         x = int.from_bytes(hashlib.sha256(data).digest(), 'big') % p
         y_sq = (pow(x, 3, p) + a * x + b) % p
-        y = pow(y_sq, (p + 1) // 4, p)
+        y = powmod(y_sq, (p + 1) // 4, p)
         if pow(y, 2, p) == y_sq:
             return Point(x, y)
         data = hashlib.sha256(data).digest()  # 若不满足曲线方程则重新哈希
@@ -96,17 +98,8 @@ def hash_to_curve(data):
 class Paillier:
     @staticmethod
     def generate_keys():
-        def generate_prime(bit_length=2048):
-            while True:
-                p = int.from_bytes(os.urandom(bit_length // 8), 'big') | 1
-                if pow(2, p - 1, p) == 1:
-                    return p
-
-        p = generate_prime()
-        q = generate_prime()
-        while p == q:
-            q = generate_prime()
-
+        # 小素数筛 + Miller–Rabin，p、q在进程池中并行搜索
+        p, q = generate_primes(2, 2048)
         n = p * q
         g = n + 1
         lamb = (p - 1) * (q - 1)
@@ -116,14 +109,14 @@ class Paillier:
     @staticmethod
     def encrypt(pk, m):
         n, g = pk
-        r = int.from_bytes(os.urandom(32), 'big') % (n - 1) + 1
-        return (pow(g, m, n * n) * pow(r, n, n * n)) % (n * n)
+        r = randbelow(n - 1) + 1
+        return (powmod(g, m, n * n) * powmod(r, n, n * n)) % (n * n)
 
     @staticmethod
     def decrypt(sk, pk, c):
         n, _ = pk
         lamb, mu = sk
-        return (pow(c, lamb, n * n) - 1) // n * mu % n
+        return (powmod(c, lamb, n * n) - 1) // n * mu % n
 
     @staticmethod
     def add(pk, c1, c2):
@@ -131,31 +124,30 @@ class Paillier:
         return (c1 * c2) % (n * n)
 
 
+# 盲化乘法使用Montgomery阶梯（已知y时为共Z阶梯ladder，只有x时为XZ阶梯ladder_x），每一位的运算与k无关；
+# 集合比较只依赖x坐标（x(kP) = x(-kP)），
+# 点以32字节x坐标传输和比较
+# 凭据哈希到曲线点的映射用gpc_hash批量完成（带LRU缓存）
+def credential_hash(username, password):
+    return hashlib.sha256(f"{username}:{password}".encode()).digest()
+
+
 def user_step1(credentials, k1):
-    msg1 = []
-    for (username, password) in credentials:
-        cred_hash = hashlib.sha256(f"{username}:{password}".encode()).digest()
-        P = hash_to_curve(cred_hash)
-        Q = scalar_mult(k1, P)
-        msg1.append(Q)
+    cred_hashes = [credential_hash(username, password) for (username, password) in credentials]
+    msg1 = [encode_x(ladder(k1, P)) for P in hash_to_curve_many(cred_hashes)]
 
     random.shuffle(msg1)
-    return [(q.x, q.y) for q in msg1]
+    return msg1
 
 
 def server_step2(leaked_db, msg1, k2, paillier_pk):
-    msg2_part1 = []
-    for x, y in msg1:
-        P = Point(x, y)
-        Q = scalar_mult(k2, P)
-        msg2_part1.append((Q.x, Q.y))
+    msg2_part1 = [encode_x(ladder_x(k2, decode_x(x))) for x in msg1]
 
     msg2_part2 = []
-    for cred_hash, count in leaked_db:
-        P = hash_to_curve(cred_hash)
-        Q = scalar_mult(k2, P)
+    points = hash_to_curve_many(cred_hash for cred_hash, _ in leaked_db)
+    for (_, count), P in zip(leaked_db, points):
         enc_count = Paillier.encrypt(paillier_pk, count)
-        msg2_part2.append((Q.x, Q.y, enc_count))
+        msg2_part2.append((encode_x(ladder(k2, P)), enc_count))
 
     random.shuffle(msg2_part1)
     random.shuffle(msg2_part2)
@@ -164,11 +156,12 @@ def server_step2(leaked_db, msg1, k2, paillier_pk):
 
 def user_step3(msg2, k1, paillier_pk):
     msg2_part1, msg2_part2 = msg2
-    user_set = {Point(x, y) for x, y in msg2_part1}
+    user_set = FingerprintSet(msg2_part1)  # {x(k1·k2·H(u))}的64比特指纹
     sum_enc = 0
 
-    for x, y, enc_count in msg2_part2:
-        if Point(x, y) in user_set:
+    for x, enc_count in msg2_part2:
+        # 对服务器的k2·H(w)再乘k1，得到可与user_set比较的x(k1·k2·H(w))
+        if user_set.contains_x(ladder_x(k1, decode_x(x))):
             sum_enc = enc_count if sum_enc == 0 else Paillier.add(paillier_pk, sum_enc, enc_count)
 
     return sum_enc
@@ -180,8 +173,8 @@ def server_step4(sum_enc, paillier_sk, paillier_pk):
 
 def main():
     # 生成随机密钥
-    k1 = int.from_bytes(os.urandom(32), 'big') % (n - 1) + 1
-    k2 = int.from_bytes(os.urandom(32), 'big') % (n - 1) + 1
+    k1 = randbelow(n - 1) + 1
+    k2 = randbelow(n - 1) + 1
     paillier_pk, paillier_sk = Paillier.generate_keys()
 
     # 测试数据
@@ -1,19 +1,24 @@
 import os
+import time
 from gmssl import sm3
 
+from bigint_backend import mpz, invert
+
 # SM2核心参数（GB/T 32918标准）
 p_hex = "8542D69E4C044F18E8B92435BF6FF7DE457283915C45517D722EDB8B08F1DFC3"
 a_hex = "787968B4FA32C3FD2417842E73BBFEFF2F3C848B6831D7E0EC65228B3937E498"
 b_hex = "63E4C6D3B23B0C849CF84241484BFE48F61D59A5B16BA06E6E12D1DA27C5249A"
 n_hex = "8542D69E4C044F18E8B92435BF6FF7DD297720630485628D5AE74EE7C32E79B7"
-Gx_hex = "421DEBD61B62EAB6746434EBC3CC315E32220B3BADDD50BDC4C4E6C147FEDD43D"
+Gx_hex = "421DEBD61B62EAB6746434EBC3CC315E32220B3BADD50BDC4C4E6C147FEDD43D"
 Gy_hex = "0680512BCBB42C07D47349D2153B70C4E5D7FDFCBFA36EA1A85841B9E46E09A2"
 
-p = int(p_hex, 16)
-a = int(a_hex, 16)
-b = int(b_hex, 16)
-n = int(n_hex, 16)
-G = (int(Gx_hex, 16), int(Gy_hex, 16))  # 基点
+p = mpz(int(p_hex, 16))
+a = mpz(int(a_hex, 16))
+b = mpz(int(b_hex, 16))
+n = mpz(int(n_hex, 16))
+
+# 故障检测调试模式：开启后每次点加都校验输入和结果是否在曲线上
+DEBUG_CHECKS = False
 
 
 def int_to_32bytes(num):
@@ -22,18 +27,11 @@ def int_to_32bytes(num):
 
 
 def mod_inverse(a, mod):
-    """扩展欧几里得算法求模逆（确保结果为正）"""
-
-    def extended_gcd(a, b):
-        if b == 0:
-            return (a, 1, 0)
-        g, x, y = extended_gcd(b, a % b)
-        return (g, y, x - (a // b) * y)
-
-    g, x, y = extended_gcd(a, mod)
-    if g != 1:
+    """模逆（gmpy2.invert或内置pow，避免递归扩展欧几里得的深递归）"""
+    try:
+        return invert(a, mod)  # 结果已在[0, mod)内
+    except ZeroDivisionError:
         return None
-    return x % mod  # 强制取模确保为正
 
 
 def is_on_curve(point):
@@ -41,18 +39,43 @@ def is_on_curve(point):
     if point is None:
         return False
     x, y = point
+    if not (0 <= x < p and 0 <= y < p):
+        return False
     left = (y * y) % p
     right = (x * x * x + a * x + b) % p
     return left == right
 
 
+class ValidPoint(tuple):
+    """已校验在曲线上的点，只在信任边界（公钥解析、反序列化、运算结果）构造一次"""
+    __slots__ = ()
+
+    def __new__(cls, point):
+        if isinstance(point, ValidPoint):
+            return point
+        if point is None or len(point) != 2 or not is_on_curve(tuple(point)):
+            raise ValueError("点不在曲线上")
+        return tuple.__new__(cls, point)
+
+
+def parse_point(point):
+    """公钥等外部输入的解析入口，无效时返回None"""
+    try:
+        return ValidPoint(point)
+    except (TypeError, ValueError):
+        return None
+
+
+G = ValidPoint((int(Gx_hex, 16), int(Gy_hex, 16)))  # 基点
+
+
 def point_add(p1, p2):
-    """椭圆曲线点加（严格遵循标准公式，增加曲线校验）"""
+    """椭圆曲线点加（输入应为已校验的点，内部运算不再重复校验）"""
     if p1 is None:
         return p2
     if p2 is None:
         return p1
-    if not (is_on_curve(p1) and is_on_curve(p2)):
+    if DEBUG_CHECKS and not (is_on_curve(p1) and is_on_curve(p2)):
         return None  # 输入点不在曲线上
 
     x1, y1 = p1
@@ -77,20 +100,20 @@ def point_add(p1, p2):
         return None
     lam = (numerator * inv_den) % p
 
-    # 计算新坐标（严格模p，确保在曲线上）
+    # 计算新坐标（模p后已非负）
     x3 = (pow(lam, 2, p) - x1 - x2) % p
     y3 = (lam * (x1 - x3) - y1) % p
-    x3 = x3 % p  # 确保非负
-    y3 = y3 % p
     result = (x3, y3)
 
-    # 验证结果是否在曲线上
-    return result if is_on_curve(result) else None
+    if DEBUG_CHECKS and not is_on_curve(result):
+        return None
+    return result
 
 
 def scalar_mult(k, point):
-    """标量乘法（优化迭代逻辑，增加中间结果校验）"""
-    if not is_on_curve(point):
+    """标量乘法（入口校验一次输入点，结果校验一次后作为ValidPoint返回）"""
+    point = parse_point(point)
+    if point is None:
         return None
     result = None  # 无穷远点
     current = point
@@ -98,13 +121,13 @@ def scalar_mult(k, point):
     while k > 0:
         if k & 1:
             result = point_add(result, current)
-            if result is None:
+            if DEBUG_CHECKS and result is None:
                 return None  # 中间结果无效
         current = point_add(current, current)  # 点加倍
-        if current is None:
-            return None
+        if DEBUG_CHECKS and current is None:
+            return None  # 中间结果无效
         k >>= 1
-    return result
+    return parse_point(result)
 
 
 def generate_key_pair():
@@ -112,7 +135,7 @@ def generate_key_pair():
     while True:
         d = int.from_bytes(os.urandom(32), 'big') % (n - 1) + 1
         P = scalar_mult(d, G)
-        if P is not None and is_on_curve(P):
+        if P is not None:
             return d, P
 
 
@@ -171,7 +194,8 @@ def verify(PA, ID, message, signature):
     # 范围校验
     if not (1 <= r < n and 1 <= s < n):
         return False
-    if not is_on_curve(PA):
+    PA = parse_point(PA)
+    if PA is None:
         return False  # 公钥无效
 
     ZA = compute_ZA(ID, PA)
@@ -197,6 +221,34 @@ def verify(PA, ID, message, signature):
     return (e + x1) % n == r
 
 
+def benchmark(rounds=50):
+    """比较默认模式与DEBUG_CHECKS故障检测模式的标量乘法/验签耗时"""
+    global DEBUG_CHECKS
+    d, PA = generate_key_pair()
+    ID = "ALICE123@YAHOO.COM"
+    message = "Test SM2"
+    signature = sign(d, PA, ID, message)
+
+    timings = {}
+    for debug in (True, False):
+        DEBUG_CHECKS = debug
+        start = time.perf_counter()
+        for _ in range(rounds):
+            scalar_mult(d, G)
+        mult_time = (time.perf_counter() - start) / rounds * 1000
+        start = time.perf_counter()
+        for _ in range(rounds):
+            verify(PA, ID, message, signature)
+        verify_time = (time.perf_counter() - start) / rounds * 1000
+        timings[debug] = (mult_time, verify_time)
+    DEBUG_CHECKS = False
+
+    for debug, (mult_time, verify_time) in timings.items():
+        mode = "逐次校验(DEBUG_CHECKS)" if debug else "边界校验(默认)"
+        print(f"{mode}: 标量乘法 {mult_time:.3f} ms, 验签 {verify_time:.3f} ms")
+    print(f"标量乘法加速比: {timings[True][0] / timings[False][0]:.2f}x")
+
+
 # 测试
 if __name__ == "__main__":
     # 生成密钥对
@@ -212,3 +264,5 @@ if __name__ == "__main__":
 
     # 验证
     print("签名验证:", verify(PA, ID, message, signature))
+
+    benchmark()
@@ -0,0 +1,101 @@
+import os
+import time
+
+# 大整数后端：安装了gmpy2（>= 2.2，mpz需支持to_bytes）时使用mpz/powmod/invert/legendre，否则退回内置int
+# 设置环境变量 BIGINT_BACKEND=int 可强制使用内置int（便于对比测试）
+try:
+    if os.environ.get('BIGINT_BACKEND', 'auto') == 'int':
+        raise ImportError
+    import gmpy2
+    if not hasattr(gmpy2.mpz, 'to_bytes'):
+        raise ImportError
+except ImportError:
+    gmpy2 = None
+
+
+def _int_legendre(x, m):
+    """Legendre符号(x/m)，m为奇素数，返回-1、0或1
+
+    二进制Jacobi符号算法，只有移位和取模，比欧拉判别法的模幂快数倍。
+    """
+    x %= m
+    result = 1
+    while x:
+        shift = (x & -x).bit_length() - 1
+        x >>= shift
+        if shift & 1 and m & 7 in (3, 5):
+            result = -result
+        if x & m & 2:
+            result = -result
+        x, m = m % x, x
+    return result if m == 1 else 0
+
+
+if gmpy2 is not None:
+    BACKEND = 'gmpy2'
+    mpz = gmpy2.mpz
+    powmod = gmpy2.powmod
+
+    def invert(x, m):
+        """模逆，不可逆时抛出ZeroDivisionError"""
+        return gmpy2.invert(x, m)
+
+    def legendre(x, m):
+        """Legendre符号(x/m)，m为奇素数，返回-1、0或1"""
+        return gmpy2.legendre(x, m)
+else:
+    BACKEND = 'int'
+    mpz = int
+    powmod = pow
+
+    def invert(x, m):
+        """模逆，不可逆时抛出ZeroDivisionError"""
+        try:
+            return pow(x, -1, m)
+        except ValueError:
+            raise ZeroDivisionError('模逆不存在') from None
+
+    legendre = _int_legendre
+
+
+def _time(func, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def benchmark():
+    print(f"当前后端: {BACKEND}")
+    if gmpy2 is None:
+        print("gmpy2（>= 2.2）未安装或已被BIGINT_BACKEND=int禁用，无法对比")
+        return
+
+    from sm2_field import p as field_p
+
+    p = int(field_p)  # 内置int版本使用纯int参与运算
+
+    x = int.from_bytes(os.urandom(32), 'big') % p
+    y = int.from_bytes(os.urandom(32), 'big') % p
+    pn = int.from_bytes(os.urandom(256), 'big') | (1 << 2047) | 1  # 2048比特规模的Paillier参数
+    qn = int.from_bytes(os.urandom(256), 'big') | (1 << 2047) | 1
+    N = pn * qn
+    NN = N * N
+    r = int.from_bytes(os.urandom(512), 'big') % N
+    X, Y, P, R, N_, NN_ = (gmpy2.mpz(v) for v in (x, y, p, r, N, NN))
+
+    cases = [
+        ("256比特模乘", lambda: x * y % p, lambda: X * Y % P, 200000),
+        ("256比特模逆", lambda: pow(x, -1, p), lambda: gmpy2.invert(X, P), 20000),
+        ("256比特模幂(开平方)", lambda: pow(x, (p + 1) // 4, p), lambda: gmpy2.powmod(X, (P + 1) // 4, P), 2000),
+        ("256比特Legendre符号", lambda: _int_legendre(x, p), lambda: gmpy2.legendre(X, P), 2000),
+        ("Paillier r^n mod n²(4096比特)", lambda: pow(r, N, NN), lambda: gmpy2.powmod(R, N_, NN_), 3),
+    ]
+    for name, builtin, fast, rounds in cases:
+        int_us = _time(builtin, rounds)
+        gmp_us = _time(fast, rounds)
+        print(f"{name}: int {int_us:.2f} µs, gmpy2 {gmp_us:.2f} µs, 加速比 {int_us / gmp_us:.2f}x")
+
+
+if __name__ == "__main__":
+    benchmark()
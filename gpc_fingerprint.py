@@ -0,0 +1,164 @@
+import os
+import sys
+import time
+import tracemalloc
+from array import array
+
+# user_step3求交用的紧凑集合：每个元素只保存x坐标的高64比特作指纹（x(k1·k2·H(u))本身是伪随机的，无需再哈希）
+# 指纹只在客户端本地使用，不传输；64比特指纹的误判概率约为 |U|·|W| / 2^64（10^6 × 10^6 时约5×10^-8）
+FINGERPRINT_SIZE = 8
+MAX_LOAD = 0.5  # 线性探测表的最大装载率；未命中平均探测约2.5次
+_X_SHIFT = 256 - 8 * FINGERPRINT_SIZE
+
+
+def fingerprint(element):
+    """32字节x编码（bytes或memoryview）的指纹；0保留给空槽，映射为1"""
+    return int.from_bytes(element[:FINGERPRINT_SIZE], 'big') or 1
+
+
+def fingerprint_x(x):
+    """x坐标整数的指纹，与fingerprint(encode_x(x))相同，省去编码"""
+    return (x >> _X_SHIFT) or 1
+
+
+class FingerprintSet:
+    """定长指纹的开放寻址表（array('Q')，线性探测，0表示空槽）
+
+    每个元素约 8 / MAX_LOAD = 16字节，不为元素创建任何Python对象；
+    可直接代替user_step3中的set(msg2_part1)，服务器行用contains_x(ladder_x(...))判断，不必先编码成bytes。
+    """
+
+    def __init__(self, elements=(), capacity=0):
+        self._table = array('Q')
+        self._mask = 0
+        self._count = 0
+        self._resize(capacity)
+        self.update(fingerprint(element) for element in elements)
+
+    @classmethod
+    def from_buffer(cls, buffer, width=32):
+        """从连续的定长条目缓冲区（如gpc_wire消息中的元素批）批量取指纹构建，不逐个切片"""
+        view = memoryview(buffer).cast('B')
+        if width % FINGERPRINT_SIZE or len(view) % width:
+            raise ValueError("缓冲区长度或条目宽度不合法")
+        words = array('Q', view.cast('Q')[::width // FINGERPRINT_SIZE])
+        if sys.byteorder == 'little':
+            words.byteswap()  # 指纹按大端解释，与fingerprint一致
+        result = cls(capacity=len(words))
+        result.update(fp or 1 for fp in words)
+        return result
+
+    def _resize(self, capacity):
+        size = 8
+        while size * MAX_LOAD < capacity:
+            size <<= 1
+        old = self._table
+        self._table = array('Q', bytes(size * FINGERPRINT_SIZE))
+        self._mask = size - 1
+        self._count = 0
+        self.update(fp for fp in old if fp)
+
+    def update(self, fingerprints):
+        """批量插入指纹（非0）；循环内联探测，不逐个调用方法"""
+        table, mask = self._table, self._mask
+        limit = len(table) * MAX_LOAD
+        for fp in fingerprints:
+            i = fp & mask
+            slot = table[i]
+            while slot and slot != fp:
+                i = (i + 1) & mask
+                slot = table[i]
+            if not slot:
+                table[i] = fp
+                self._count += 1
+                if self._count > limit:
+                    self._resize(self._count + 1)
+                    table, mask = self._table, self._mask
+                    limit = len(table) * MAX_LOAD
+
+    def add(self, element):
+        self.update((fingerprint(element),))
+
+    def contains_fingerprint(self, fp):
+        table, mask = self._table, self._mask
+        i = fp & mask
+        slot = table[i]
+        while slot:
+            if slot == fp:
+                return True
+            i = (i + 1) & mask
+            slot = table[i]
+        return False
+
+    def contains_x(self, x):
+        fp = (x >> _X_SHIFT) or 1  # 与contains_fingerprint(fingerprint_x(x))相同，内联以省去一次调用
+        table, mask = self._table, self._mask
+        i = fp & mask
+        slot = table[i]
+        while slot:
+            if slot == fp:
+                return True
+            i = (i + 1) & mask
+            slot = table[i]
+        return False
+
+    def __contains__(self, element):
+        return self.contains_fingerprint(fingerprint(element))
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def nbytes(self):
+        """表本身占用的字节数"""
+        return len(self._table) * self._table.itemsize
+
+
+def _traced(func):
+    tracemalloc.start()
+    result = func()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    func()  # 计时不在tracemalloc下进行
+    return result, size, time.perf_counter() - start
+
+
+def benchmark(entries=1_000_000, matches=1000):
+    from sm2_ladder import encode_x
+
+    # 元素用随机x代替x(k1·k2·H(u))：求交开销与元素如何产生无关；服务器行按user_step3的方式从x整数出发
+    client = [os.urandom(32) for _ in range(entries)]
+    server = ([int.from_bytes(x, 'big') for x in client[:matches]] +
+              [int.from_bytes(os.urandom(32), 'big') for _ in range(entries - matches)])
+    client_buffer = b''.join(client)
+    sample = entries // 10
+    tuples = [(int.from_bytes(x, 'big'), int.from_bytes(os.urandom(32), 'big')) for x in client[:sample]]
+
+    # 原GPC的Point集合：哈希表与(x, y)元组，两个256比特整数对象另计
+    tuple_size = _traced(lambda: set(tuple((x, y) for x, y in tuples)))[1] / sample
+    # set(msg2_part1)：bytes对象已在消息中，只计哈希表；解码自gpc_wire时每个元素还要一个memoryview
+    bytes_set, bytes_size, bytes_build = _traced(lambda: set(client))
+    views_size = _traced(lambda: [memoryview(client_buffer)[i:i + 32]
+                                  for i in range(0, sample * 32, 32)])[1] / sample
+    fp_set, fp_size, fp_build = _traced(lambda: FingerprintSet(client))
+    _, _, buffer_build = _traced(lambda: FingerprintSet.from_buffer(client_buffer))
+
+    start = time.perf_counter()
+    bytes_found = sum(1 for x in server if encode_x(x) in bytes_set)
+    bytes_query = time.perf_counter() - start
+    start = time.perf_counter()
+    fp_found = sum(1 for x in server if fp_set.contains_x(x))
+    fp_query = time.perf_counter() - start
+
+    print(f"客户端 {entries} 个元素，服务器 {entries} 行（其中 {matches} 行匹配）:")
+    print(f"  (x, y)整数元组集合: {tuple_size:.0f} 字节/元素（另有两个整数对象 {2 * sys.getsizeof(tuples[0][0])} 字节）")
+    print(f"  set(bytes): {bytes_size / entries + 32 + sys.getsizeof(b''):.0f} 字节/元素（哈希表 + bytes对象；"
+          f"从gpc_wire解码时另加memoryview {views_size:.0f} 字节）, 构建 {bytes_build:.2f} s, "
+          f"查询 {bytes_query / entries * 1e9:.0f} ns/行（含encode_x）, 匹配 {bytes_found}")
+    print(f"  FingerprintSet: {fp_size / entries:.1f} 字节/元素, 构建 {fp_build:.2f} s（from_buffer {buffer_build:.2f} s）, "
+          f"查询 {fp_query / entries * 1e9:.0f} ns/行, 匹配 {fp_found}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,125 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from bigint_backend import mpz, powmod, legendre
+from sm2_field import p, a, b
+
+# 与GPC.hash_to_curve相同的映射：x = SHA256(data) mod p，y取 y² 的 (p+1)/4 次幂（p ≡ 3 mod 4），
+# y²不是二次剩余时 data = SHA256(data) 重试。点用(x, y)元组表示
+_SQRT_EXP = (p + 1) // 4
+
+
+class PointCache:
+    """凭据哈希 -> 曲线点的LRU缓存（线程安全）"""
+
+    def __init__(self, max_entries=1 << 16):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys):
+        """返回与keys对应的点列表，未命中的位置为None"""
+        with self._lock:
+            points = []
+            for key in keys:
+                point = self._entries.get(key)
+                if point is None:
+                    self.misses += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                points.append(point)
+            return points
+
+    def put_many(self, items):
+        with self._lock:
+            for key, point in items:
+                self._entries[key] = point
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+# 进程级缓存（服务器侧的泄露库条目在多次请求间复用）
+point_cache = PointCache()
+
+
+def hash_to_curve_many(cred_hashes, cache=point_cache):
+    """批量把凭据哈希映射为曲线点[(x, y), ...]，结果与GPC.hash_to_curve一致
+
+    所有未完成的输入按轮一起处理：先计算x和y²，用Legendre符号筛掉非二次剩余（约一半），
+    只对剩余的开平方，每个点只做一次模幂；其余的重新哈希进入下一轮。cache为None时不缓存。
+    """
+    cred_hashes = list(cred_hashes)
+    points = cache.get_many(cred_hashes) if cache is not None else [None] * len(cred_hashes)
+    pending = [i for i, point in enumerate(points) if point is None]
+    data = [cred_hashes[i] for i in pending]
+
+    while pending:
+        digests = [hashlib.sha256(item).digest() for item in data]
+        xs = [mpz(int.from_bytes(digest, 'big')) % p for digest in digests]
+        y_squares = [(x * x * x + a * x + b) % p for x in xs]
+
+        retry, data = [], []
+        for i, digest, x, y_sq in zip(pending, digests, xs, y_squares):
+            if legendre(y_sq, p) >= 0:
+                points[i] = (x, powmod(y_sq, _SQRT_EXP, p))
+            else:
+                retry.append(i)
+                data.append(digest)
+        if cache is not None:
+            cache.put_many((cred_hashes[i], points[i]) for i in pending if points[i] is not None)
+        pending = retry
+    return points
+
+
+def hash_to_curve(cred_hash, cache=point_cache):
+    return hash_to_curve_many([cred_hash], cache)[0]
+
+
+def benchmark(count=2000):
+    import GPC
+
+    cred_hashes = [os.urandom(32) for _ in range(count)]
+
+    start = time.perf_counter()
+    reference = [GPC.hash_to_curve(h) for h in cred_hashes]
+    single_time = time.perf_counter() - start
+
+    cache = PointCache(max_entries=count)
+    start = time.perf_counter()
+    points = hash_to_curve_many(cred_hashes, cache)
+    batch_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    hash_to_curve_many(cred_hashes, cache)
+    cached_time = time.perf_counter() - start
+
+    same = all(P.x == x and P.y == y for P, (x, y) in zip(reference, points))
+    print(f"GPC.hash_to_curve逐个映射: {count / single_time:.0f} 点/秒")
+    print(f"批量映射（Legendre筛选）: {count / batch_time:.0f} 点/秒")
+    print(f"批量映射（LRU命中）: {count / cached_time:.0f} 点/秒")
+    print(f"结果一致: {same}, 缓存: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    benchmark()
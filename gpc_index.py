@@ -0,0 +1,282 @@
+import bisect
+import hashlib
+import mmap
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+from array import array
+
+import GPC
+from sm2_ladder import ladder, ladder_x, encode_x, decode_x
+from gpc_hash import hash_to_curve_many
+from gpc_paillier import PaillierPublicKey, RnPool, generate_keypair
+
+# 泄露库索引文件：每个密钥周期（k2与Paillier密钥）离线构建一次
+# 文件头之后是2^prefix_bits + 1个桶起始序号（各8字节），然后是定长记录：
+# x(k2·H(w)) 32字节 || Enc(count) ct_size字节（大端）；记录按(凭据哈希前缀, x)排序
+INDEX_MAGIC = b'GPCI'
+INDEX_VERSION = 2
+_HEADER = struct.Struct('>4sBQIQB')  # 魔数、版本、周期编号、密文宽度、记录数、前缀比特数
+_OFFSET = struct.Struct('>Q')
+X_SIZE = 32
+MAX_PREFIX_BITS = 20  # 起始序号表最多2^20 + 1项（8 MB），构建时用array('Q')，查询时按需从映射区读取
+
+
+def hash_prefix(cred_hash, bits):
+    """凭据哈希的前bits比特（桶编号）"""
+    return int.from_bytes(cred_hash[:4], 'big') >> (32 - bits) if bits else 0
+
+
+def prefix_bits_for(count, bucket_size):
+    """使平均桶大小不小于bucket_size的前缀比特数：桶越大隐私越好，响应越大"""
+    bits = 0
+    while bits < MAX_PREFIX_BITS and count >> (bits + 1) >= bucket_size:
+        bits += 1
+    return bits
+
+
+def ciphertext_size(paillier_pk):
+    """Paillier密文定长编码的字节数（n²的字节长度）"""
+    n, _ = paillier_pk
+    return ((n * n).bit_length() + 7) // 8
+
+
+def build_index(path, leaked_db, k2, paillier_pk, epoch=0, prefix_bits=0, chunk_size=1024, paillier_sk=None):
+    """离线构建索引：每条泄露记录计算一次k2·H(w)和Enc(count)
+
+    Enc(count)用PaillierPublicKey.encrypt，每块的r^n一次批量生成；构建方持有私钥时传入paillier_sk
+    （PaillierPrivateKey），r^n按CRT计算。
+
+    记录先按块写入临时文件，内存中只保留(前缀, x, 序号)用于排序，再按顺序写出最终文件。
+    最终文件先写到同一目录下的临时文件并fsync，再用os.replace替换，中途失败不会留下不完整的索引。
+    prefix_bits > 0 时按凭据哈希前缀分桶，桶内按x排序；prefix_bits = 0 时只有一个桶。
+    按盲化后的x排序与泄露库原顺序无关，代替每次请求时的random.shuffle。
+    同一周期内密文被所有请求复用：x(k2·H(w))本身已可跨请求关联，复用密文不增加泄露。
+    """
+    if not 0 <= prefix_bits <= MAX_PREFIX_BITS:
+        raise ValueError(f"prefix_bits必须在0到{MAX_PREFIX_BITS}之间")
+    ct_size = ciphertext_size(paillier_pk)
+    record_size = X_SIZE + ct_size
+    public_key = PaillierPublicKey.from_tuple(paillier_pk)
+    rn_pool = RnPool(public_key, paillier_sk, background=False)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    new_path = f"{path}.{os.getpid()}.new"
+    keys = []
+    try:
+        with open(tmp_path, 'wb') as tmp:
+            leaked_db = iter(leaked_db)
+            while True:
+                chunk = [row for _, row in zip(range(chunk_size), leaked_db)]
+                if not chunk:
+                    break
+                points = hash_to_curve_many((cred_hash for cred_hash, _ in chunk), cache=None)
+                buffer = bytearray()
+                for (cred_hash, count), P, rn in zip(chunk, points, rn_pool.generate(len(chunk))):
+                    x = encode_x(ladder(k2, P))
+                    keys.append((hash_prefix(cred_hash, prefix_bits), x, len(keys)))
+                    buffer += x + int(public_key.encrypt(count, rn)).to_bytes(ct_size, 'big')
+                tmp.write(buffer)
+
+        keys.sort()
+        offsets = array('Q', bytes(((1 << prefix_bits) + 1) * _OFFSET.size))
+        for prefix, _, _ in keys:
+            offsets[prefix + 1] += 1
+        for i in range(1, len(offsets)):
+            offsets[i] += offsets[i - 1]
+        if sys.byteorder == 'little':
+            offsets.byteswap()  # 文件中为大端，与_OFFSET一致
+
+        with open(tmp_path, 'rb') as tmp, open(new_path, 'wb') as f:
+            f.write(_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, epoch, ct_size, len(keys), prefix_bits))
+            f.write(offsets)
+            if keys:
+                with mmap.mmap(tmp.fileno(), 0, access=mmap.ACCESS_READ) as records:
+                    for _, _, i in keys:
+                        f.write(records[i * record_size:(i + 1) * record_size])
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(new_path, path)
+    finally:
+        for leftover in (tmp_path, new_path):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    return len(keys)
+
+
+class LeakedIndex:
+    """只读、内存映射的泄露库索引
+
+    记录定长：第i条的位置可直接计算，桶的范围查起始序号表，桶内按x二分查找；
+    多个进程打开同一文件时共享操作系统的页缓存。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # 空文件无法映射
+            self._file.close()
+            raise ValueError("不是有效的GPC索引文件") from None
+        if len(self._map) < _HEADER.size:
+            self.close()
+            raise ValueError("不是有效的GPC索引文件")
+        magic, version, self.epoch, self.ct_size, self.count, self.prefix_bits = \
+            _HEADER.unpack_from(self._map, 0)
+        self.record_size = X_SIZE + self.ct_size
+        self.bucket_count = 1 << self.prefix_bits
+        start = _HEADER.size + (self.bucket_count + 1) * _OFFSET.size
+        if (magic != INDEX_MAGIC or version != INDEX_VERSION or self.prefix_bits > MAX_PREFIX_BITS or
+                len(self._map) != start + self.count * self.record_size):
+            self.close()
+            raise ValueError("不是有效的GPC索引文件")
+        self._view = memoryview(self._map)[start:]
+
+    def __len__(self):
+        return self.count
+
+    def x_at(self, i):
+        """第i条记录的x编码（指向映射区的memoryview，不复制）"""
+        offset = i * self.record_size
+        return self._view[offset:offset + X_SIZE]
+
+    def record(self, i):
+        """第i条记录：(x的32字节编码, Enc(count)整数)"""
+        offset = i * self.record_size
+        return (bytes(self._view[offset:offset + X_SIZE]),
+                int.from_bytes(self._view[offset + X_SIZE:offset + self.record_size], 'big'))
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self.record(i)
+
+    def bucket_range(self, prefix):
+        """桶prefix的记录序号范围[start, stop)"""
+        if not 0 <= prefix < self.bucket_count:
+            raise ValueError("桶编号超出范围")
+        offset = _HEADER.size + prefix * _OFFSET.size
+        return _OFFSET.unpack_from(self._map, offset)[0], _OFFSET.unpack_from(self._map, offset + _OFFSET.size)[0]
+
+    def bucket_bytes(self, prefix):
+        """桶prefix中记录的原始字节（指向映射区的memoryview，可直接发送）"""
+        start, stop = self.bucket_range(prefix)
+        return self._view[start * self.record_size:stop * self.record_size]
+
+    def bucket(self, prefix):
+        """桶prefix中的全部记录"""
+        return [self.record(i) for i in range(*self.bucket_range(prefix))]
+
+    def find(self, x, prefix=0):
+        """在桶prefix内二分查找x（32字节编码），返回记录序号或-1"""
+        x = bytes(x)
+        start, stop = self.bucket_range(prefix)
+        keys = _IndexKeys(self)
+        i = bisect.bisect_left(keys, x, start, stop)
+        return i if i < stop and keys[i] == x else -1
+
+    def close(self):
+        if getattr(self, '_view', None) is not None:
+            self._view.release()
+            self._view = None
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _IndexKeys:
+    """把索引的x列暴露为只读序列，供bisect使用"""
+
+    def __init__(self, index):
+        self._index = index
+
+    def __len__(self):
+        return len(self._index)
+
+    def __getitem__(self, i):
+        return self._index.x_at(i).tobytes()
+
+
+def user_step1(credentials, k1, prefix_bits):
+    """分桶查询的客户端第一步：返回(prefixes, msg1)
+
+    prefixes是各凭据哈希前缀去重排序后的桶编号，与msg1中元素的顺序无关；msg1与GPC.user_step1相同。
+    """
+    prefixes = sorted({hash_prefix(GPC.credential_hash(username, password), prefix_bits)
+                       for username, password in credentials})
+    return prefixes, GPC.user_step1(credentials, k1)
+
+
+def server_step2(index, msg1, k2, prefixes=None):
+    """与GPC.server_step2结果等价：每次请求只对客户端的元素做k2乘法，泄露库部分直接读索引
+
+    给出prefixes时只返回这些桶中的记录，响应大小和服务器开销只与桶大小有关；
+    桶数不得超过客户端元素数，避免一次请求取走整个库。
+    """
+    if prefixes is None:
+        entries = list(index)
+    else:
+        if len(prefixes) > max(len(msg1), 1):
+            raise ValueError("请求的桶数超过凭据数")
+        entries = [entry for prefix in sorted(set(prefixes)) for entry in index.bucket(prefix)]
+    msg2_part1 = [encode_x(ladder_x(k2, decode_x(x))) for x in msg1]
+    random.shuffle(msg2_part1)
+    return (msg2_part1, entries)
+
+
+def _message_bytes(msg2):
+    part1, part2 = msg2
+    return sum(len(x) for x in part1) + sum(len(x) + (c.bit_length() + 7) // 8 for x, c in part2)
+
+
+def benchmark(rows=64, bucket_size=4):
+    from sm3_drbg import randbelow
+    from sm2_field import n
+
+    k1 = randbelow(n - 1) + 1
+    k2 = randbelow(n - 1) + 1
+    public_key, private_key = generate_keypair()
+    paillier_pk, paillier_sk = public_key.as_tuple(), private_key.as_tuple()
+    credentials = [(f"user{i}", f"pass{i}") for i in range(3)]
+    leaked_db = [(hashlib.sha256(f"leak{i}:{i}".encode()).digest(), i % 7 + 1) for i in range(rows)]
+    leaked_db += [(GPC.credential_hash(u, pw), 5) for u, pw in credentials[:2]]
+    prefix_bits = prefix_bits_for(len(leaked_db), bucket_size)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'gpc_leaked.idx')
+        start = time.perf_counter()
+        build_index(path, leaked_db, k2, paillier_pk, prefix_bits=prefix_bits, paillier_sk=private_key)
+        build_time = time.perf_counter() - start
+
+        prefixes, msg1 = user_step1(credentials, k1, prefix_bits)
+        start = time.perf_counter()
+        msg2 = GPC.server_step2(leaked_db, msg1, k2, paillier_pk)
+        online_time = time.perf_counter() - start
+        expected = GPC.server_step4(GPC.user_step3(msg2, k1, paillier_pk), paillier_sk, paillier_pk)
+
+        results = []
+        with LeakedIndex(path) as index:
+            for query in (None, prefixes):
+                start = time.perf_counter()
+                msg2 = server_step2(index, msg1, k2, query)
+                elapsed = time.perf_counter() - start
+                result = GPC.server_step4(GPC.user_step3(msg2, k1, paillier_pk), paillier_sk, paillier_pk)
+                results.append((elapsed, len(msg2[1]), _message_bytes(msg2), result))
+            size = os.path.getsize(path)
+
+    print(f"离线构建索引（{len(leaked_db)} 条，{1 << prefix_bits} 个桶）: {build_time:.2f} s, 文件 {size} 字节")
+    print(f"GPC.server_step2每次请求: {online_time * 1000:.1f} ms, 匹配次数: {expected}")
+    for name, (elapsed, count, nbytes, result) in zip(("索引（整库）", "索引（分桶）"), results):
+        print(f"{name}server_step2每次请求: {elapsed * 1000:.1f} ms, 返回 {count} 条 / {nbytes} 字节, "
+              f"匹配次数: {result}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,142 @@
+import hashlib
+import random
+import time
+
+import GPC
+from bigint_backend import powmod
+from sm2_ladder import ladder, ladder_x, encode_x, decode_x
+from gpc_hash import hash_to_curve_many
+from gpc_fingerprint import FingerprintSet
+from gpc_paillier import PaillierPublicKey
+from sm3_drbg import randbelow
+
+# Paillier明文分槽打包：一个密文携带slots条记录的计数
+# 客户端用 C^(Σ 2^(W·(slots-1-j))) 把各匹配槽j平移到结果槽slots-1后相乘求和，
+# 平移产生的交叉项落在其他槽（共2·slots-1个槽），提交前用统计隐藏的随机掩码盖住
+COUNT_BITS = 16  # 单条计数上限2^16
+ROW_BITS = 24  # 泄露库条数上限2^24，决定求和的进位余量
+SIGMA = 40  # 掩码的统计隐藏参数（比特）
+
+
+class SlotLayout:
+    """分槽参数：每槽slot_bits比特 = 内容(count_bits + row_bits) + 掩码余量sigma + 1"""
+
+    def __init__(self, n, count_bits=COUNT_BITS, row_bits=ROW_BITS, sigma=SIGMA):
+        self.count_bits = count_bits
+        self.row_bits = row_bits
+        self.content_bits = count_bits + row_bits
+        self.sigma = sigma
+        self.slot_bits = self.content_bits + sigma + 1
+        positions = (n.bit_length() - 1) // self.slot_bits  # 明文必须小于n
+        self.slots = (positions + 1) // 2
+        if self.slots < 1:
+            raise ValueError("Paillier模数太小，无法分槽")
+        self.result_slot = self.slots - 1
+        self._mask = (1 << self.slot_bits) - 1
+
+    def pack(self, counts):
+        value = 0
+        for i, count in enumerate(counts):
+            if not 0 <= count < 1 << self.count_bits:
+                raise ValueError(f"计数必须在[0, 2^{self.count_bits})内")
+            value |= count << (i * self.slot_bits)
+        return value
+
+    def unpack(self, value, count=None):
+        """拆分明文的前count个槽（默认全部2·slots-1个）"""
+        count = 2 * self.slots - 1 if count is None else count
+        return [(value >> (i * self.slot_bits)) & self._mask for i in range(count)]
+
+    def selector(self, slot):
+        """把第slot槽平移到结果槽的指数"""
+        return 1 << (self.slot_bits * (self.result_slot - slot))
+
+    def mask(self):
+        """除结果槽外每个槽一个[0, 2^(content_bits + sigma))的随机数；内容 < 2^content_bits，不会进位"""
+        bound = 1 << (self.content_bits + self.sigma)
+        return sum(randbelow(bound) << (i * self.slot_bits)
+                   for i in range(2 * self.slots - 1) if i != self.result_slot)
+
+
+def server_step2(leaked_db, msg1, k2, paillier_pk, layout=None):
+    """返回(msg2_part1, 各行的x列表, 打包密文列表)；第i行的计数在第i // slots个密文的第i % slots槽"""
+    public_key = PaillierPublicKey.from_tuple(paillier_pk)
+    layout = layout or SlotLayout(public_key.n)
+    if len(leaked_db) >= 1 << layout.row_bits:
+        raise ValueError("泄露库条数超过打包参数允许的上限")
+
+    msg2_part1 = [encode_x(ladder_x(k2, decode_x(x))) for x in msg1]
+    rows = list(zip(hash_to_curve_many(cred_hash for cred_hash, _ in leaked_db), (count for _, count in leaked_db)))
+    random.shuffle(msg2_part1)
+    random.shuffle(rows)
+
+    xs = [encode_x(ladder(k2, P)) for P, _ in rows]
+    packed = [public_key.encrypt(layout.pack([count for _, count in rows[i:i + layout.slots]]))
+              for i in range(0, len(rows), layout.slots)]
+    return (msg2_part1, xs, packed)
+
+
+def user_step3(msg2, k1, paillier_pk, layout=None):
+    """返回结果槽为匹配计数之和、其余槽被掩码覆盖的密文（无匹配时也返回密文，不暴露是否命中）"""
+    public_key = PaillierPublicKey.from_tuple(paillier_pk)
+    layout = layout or SlotLayout(public_key.n)
+    msg2_part1, xs, packed = msg2
+    user_set = FingerprintSet(msg2_part1)
+
+    selectors = {}
+    for i, x in enumerate(xs):
+        if user_set.contains_x(ladder_x(k1, decode_x(x))):
+            group, slot = divmod(i, layout.slots)
+            selectors[group] = selectors.get(group, 0) + layout.selector(slot)
+
+    sum_enc = public_key.encrypt(layout.mask())
+    for group, exponent in selectors.items():
+        sum_enc = public_key.add(sum_enc, powmod(packed[group], exponent, public_key.n2))
+    return sum_enc
+
+
+def server_step4(sum_enc, paillier_sk, paillier_pk, layout=None):
+    layout = layout or SlotLayout(paillier_pk[0])
+    value = GPC.Paillier.decrypt(paillier_sk, paillier_pk, sum_enc)
+    return layout.unpack(value, layout.slots)[layout.result_slot]
+
+
+def _ciphertext_bytes(ciphertexts):
+    return sum((c.bit_length() + 7) // 8 for c in ciphertexts)
+
+
+def benchmark(rows=100):
+    from sm2_field import n
+
+    k1 = randbelow(n - 1) + 1
+    k2 = randbelow(n - 1) + 1
+    paillier_pk, paillier_sk = GPC.Paillier.generate_keys()
+    layout = SlotLayout(paillier_pk[0])
+    credentials = [(f"user{i}", f"pass{i}") for i in range(5)]
+    leaked_db = [(hashlib.sha256(f"leak{i}:{i}".encode()).digest(), i % 7 + 1) for i in range(rows)]
+    leaked_db += [(GPC.credential_hash(u, pw), 1000 + i) for i, (u, pw) in enumerate(credentials[:3])]
+    msg1 = GPC.user_step1(credentials, k1)
+
+    start = time.perf_counter()
+    msg2 = GPC.server_step2(leaked_db, msg1, k2, paillier_pk)
+    plain_server = time.perf_counter() - start
+    plain_result = GPC.server_step4(GPC.user_step3(msg2, k1, paillier_pk), paillier_sk, paillier_pk)
+    plain_bytes = _ciphertext_bytes(c for _, c in msg2[1])
+
+    start = time.perf_counter()
+    msg2 = server_step2(leaked_db, msg1, k2, paillier_pk, layout)
+    packed_server = time.perf_counter() - start
+    start = time.perf_counter()
+    sum_enc = user_step3(msg2, k1, paillier_pk, layout)
+    packed_client = time.perf_counter() - start
+    packed_result = server_step4(sum_enc, paillier_sk, paillier_pk, layout)
+
+    print(f"分槽参数: 每槽 {layout.slot_bits} 比特, 每个密文 {layout.slots} 条计数")
+    print(f"逐条加密: {len(leaked_db)} 次加密, 密文 {plain_bytes} 字节, server_step2 {plain_server:.2f} s")
+    print(f"打包加密: {len(msg2[2])} 次加密, 密文 {_ciphertext_bytes(msg2[2])} 字节, "
+          f"server_step2 {packed_server:.2f} s, user_step3 {packed_client:.2f} s")
+    print(f"匹配计数: 逐条 {plain_result}, 打包 {packed_result}, 一致: {plain_result == packed_result}")
+
+
+if __name__ == "__main__":
+    benchmark()
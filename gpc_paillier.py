@@ -0,0 +1,272 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from bigint_backend import mpz, powmod, invert
+from precompute_pool import PrecomputePool
+from sm3_drbg import randbelow, randbelow_many
+
+# 与GPC.Paillier同一方案（g = n + 1），密文可互相解密；公私钥可与GPC使用的元组互转
+
+
+class PaillierPublicKey:
+    """Paillier公钥：g = n + 1 时 g^m mod n² = 1 + m·n，加密只需一次r^n"""
+    __slots__ = ['n', 'n2', 'g']
+
+    def __init__(self, n):
+        self.n = mpz(n)
+        self.n2 = self.n * self.n
+        self.g = self.n + 1
+
+    @classmethod
+    def from_tuple(cls, pk):
+        n, g = pk
+        if g != n + 1:
+            raise ValueError("只支持g = n + 1的公钥")
+        return cls(n)
+
+    def as_tuple(self):
+        """GPC.Paillier使用的(n, g)"""
+        return (self.n, self.g)
+
+    def random_rn(self):
+        r = randbelow(self.n - 1) + 1
+        return powmod(r, self.n, self.n2)
+
+    def encrypt(self, m, rn=None):
+        """c = (1 + m·n)·r^n mod n²；rn为预先计算的r^n（如取自RnPool），省去在线模幂"""
+        if rn is None:
+            rn = self.random_rn()
+        return (1 + m % self.n * self.n) * rn % self.n2
+
+    def add(self, c1, c2):
+        return c1 * c2 % self.n2
+
+
+class PaillierPrivateKey:
+    """Paillier私钥：按p²、q²分别解密再CRT合并，模数和指数都减半"""
+    __slots__ = ['public_key', 'p', 'q', 'p2', 'q2', 'hp', 'hq', 'q_inv', 'q2_inv']
+
+    def __init__(self, public_key, p, q):
+        if p * q != public_key.n:
+            raise ValueError("p·q与公钥n不一致")
+        self.public_key = public_key
+        self.p, self.q = mpz(p), mpz(q)
+        self.p2, self.q2 = self.p * self.p, self.q * self.q
+        g = public_key.g
+        # h_p = L_p(g^(p-1) mod p²)⁻¹ mod p，L_p(x) = (x - 1) / p
+        self.hp = invert((powmod(g, self.p - 1, self.p2) - 1) // self.p, self.p)
+        self.hq = invert((powmod(g, self.q - 1, self.q2) - 1) // self.q, self.q)
+        self.q_inv = invert(self.q, self.p)
+        self.q2_inv = invert(self.q2, self.p2)
+
+    def as_tuple(self):
+        """GPC.Paillier使用的(λ, μ)，λ = (p-1)(q-1)"""
+        lamb = (self.p - 1) * (self.q - 1)
+        return (lamb, invert(lamb, self.public_key.n))
+
+    def decrypt(self, c):
+        mp = (powmod(c % self.p2, self.p - 1, self.p2) - 1) // self.p * self.hp % self.p
+        mq = (powmod(c % self.q2, self.q - 1, self.q2) - 1) // self.q * self.hq % self.q
+        return mq + (mp - mq) * self.q_inv % self.p * self.q
+
+    def rn(self, r):
+        """用CRT计算r^n mod n²（持有私钥的一方，如服务器加密计数时）"""
+        n = self.public_key.n
+        rp = powmod(r, n % (self.p * (self.p - 1)), self.p2)
+        rq = powmod(r, n % (self.q * (self.q - 1)), self.q2)
+        return rq + (rp - rq) * self.q2_inv % self.p2 * self.q2
+
+
+class RnPool(PrecomputePool):
+    """预计算r^n mod n²的池（后台补充线程、水位、统计和fork处理见precompute_pool）
+
+    给出私钥时用CRT生成；take()取到的值直接传给PaillierPublicKey.encrypt。
+    """
+    thread_name = "paillier-rn-pool"
+
+    def __init__(self, public_key, private_key=None, capacity=256, low_water=64, batch=16, background=True):
+        self.public_key = public_key
+        self.private_key = private_key
+        super().__init__(capacity, low_water, batch, background)
+
+    def generate(self, count):
+        rs = [r + 1 for r in randbelow_many(self.public_key.n - 1, count)]
+        if self.private_key is not None:
+            return [self.private_key.rn(r) for r in rs]
+        return [powmod(r, self.public_key.n, self.public_key.n2) for r in rs]
+
+
+def _small_primes(limit):
+    sieve = bytearray([1]) * limit
+    sieve[:2] = b'\x00\x00'
+    for i in range(2, int(limit ** 0.5) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = bytes(len(range(i * i, limit, i)))
+    return [i for i in range(3, limit) if sieve[i]]
+
+
+SMALL_PRIMES = _small_primes(1 << 14)  # 试除筛用的奇素数（< 16384，约1900个）
+SIEVE_WINDOW = 8192  # 每个搜索窗口的奇数候选个数；2048比特附近每窗口平均约11个素数
+MR_ROUNDS = 5  # 随机候选上Miller–Rabin的轮数（误判概率远低于2^-100）
+
+
+def is_probable_prime(candidate, rounds=MR_ROUNDS):
+    """Miller–Rabin素性测试（随机底数）"""
+    if candidate < 4:
+        return candidate in (2, 3)
+    if candidate % 2 == 0:
+        return False
+    d = candidate - 1
+    s = (d & -d).bit_length() - 1
+    d >>= s
+    for _ in range(rounds):
+        x = powmod(randbelow(candidate - 3) + 2, d, candidate)
+        if x == 1 or x == candidate - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % candidate
+            if x == candidate - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def search_window(bits, start=None):
+    """在[start, start + 2·SIEVE_WINDOW)的奇数中找一个素数，没有则返回None
+
+    先用小素数筛标记窗口内的合数（每个小素数只需一次取模和一次切片赋值），
+    只有筛后留下的约1/12候选做Miller–Rabin。start默认取最高两位为1的随机奇数，保证p·q恰为2·bits比特。
+    """
+    if start is None:
+        start = int.from_bytes(os.urandom(bits // 8), 'big') | (3 << (bits - 2)) | 1
+    sieve = bytearray([1]) * SIEVE_WINDOW
+    for prime in SMALL_PRIMES:
+        # 第一个满足 start + 2i ≡ 0 (mod prime) 的i
+        first = (-start) * ((prime + 1) // 2) % prime
+        sieve[first::prime] = bytes(len(range(first, SIEVE_WINDOW, prime)))
+    start = mpz(start)
+    for i in range(SIEVE_WINDOW):
+        if sieve[i] and is_probable_prime(start + 2 * i):
+            return start + 2 * i
+    return None
+
+
+def generate_prime(bits=2048):
+    while True:
+        prime = search_window(bits)
+        if prime is not None:
+            return prime
+
+
+def generate_primes(count, bits=2048, workers=None):
+    """并行搜索count个互不相同的素数：每个任务搜索一个随机窗口，进程池中同时跑workers个
+
+    workers为1（或单核）时在当前进程内顺序搜索。
+    """
+    workers = workers or os.cpu_count() or 1
+    primes = []
+    if workers == 1:
+        while len(primes) < count:
+            prime = generate_prime(bits)
+            if prime not in primes:
+                primes.append(prime)
+        return primes
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(search_window, bits) for _ in range(workers)}
+        while len(primes) < count:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                prime = future.result()
+                if prime is not None and prime not in primes and len(primes) < count:
+                    primes.append(prime)
+            pending |= {executor.submit(search_window, bits)
+                        for _ in range(min(workers - len(pending), count - len(primes)))}
+        for future in pending:
+            future.cancel()
+    return primes
+
+
+def generate_keypair(prime_bits=2048, workers=None):
+    """返回(PaillierPublicKey, PaillierPrivateKey)，p、q并行搜索"""
+    p, q = generate_primes(2, prime_bits, workers)
+    public_key = PaillierPublicKey(p * q)
+    return public_key, PaillierPrivateKey(public_key, p, q)
+
+
+def benchmark_primes(rounds=4, bits=2048):
+    def fermat_prime():
+        # GPC.Paillier.generate_keys原来的做法：随机奇数逐个做一次Fermat测试
+        while True:
+            candidate = mpz(int.from_bytes(os.urandom(bits // 8), 'big') | 1)
+            if powmod(2, candidate - 1, candidate) == 1:
+                return candidate
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fermat_prime()
+    fermat_time = (time.perf_counter() - start) / rounds
+
+    start = time.perf_counter()
+    primes = generate_primes(rounds, bits, workers=1)
+    sieve_time = (time.perf_counter() - start) / rounds
+
+    workers = max(2, os.cpu_count() or 1)
+    start = time.perf_counter()
+    generate_primes(rounds, bits, workers)
+    parallel_time = (time.perf_counter() - start) / rounds
+
+    print(f"{bits}比特素数生成: 逐个Fermat测试 {fermat_time:.2f} s/个, 筛法 + Miller–Rabin {sieve_time:.2f} s/个, "
+          f"{workers}进程并行 {parallel_time:.2f} s/个（本机 {os.cpu_count()} 核）")
+    print(f"Miller–Rabin复核: {all(is_probable_prime(p, 20) for p in primes)}\n")
+
+
+def benchmark(rounds=10):
+    from GPC import Paillier
+
+    start = time.perf_counter()
+    public_key, private_key = generate_keypair()
+    keygen_time = time.perf_counter() - start
+    pk, sk = public_key.as_tuple(), private_key.as_tuple()
+    messages = list(range(1, rounds + 1))
+
+    start = time.perf_counter()
+    old_ciphertexts = [Paillier.encrypt(pk, m) for m in messages]
+    old_encrypt = (time.perf_counter() - start) / rounds * 1000
+    start = time.perf_counter()
+    old_plain = [Paillier.decrypt(sk, pk, c) for c in old_ciphertexts]
+    old_decrypt = (time.perf_counter() - start) / rounds * 1000
+
+    start = time.perf_counter()
+    for m in messages:
+        public_key.encrypt(m)
+    shortcut_encrypt = (time.perf_counter() - start) / rounds * 1000
+
+    pool = RnPool(public_key, private_key, capacity=rounds, background=False)
+    start = time.perf_counter()
+    pool.fill()
+    fill_time = (time.perf_counter() - start) / rounds * 1000
+    start = time.perf_counter()
+    ciphertexts = [public_key.encrypt(m, pool.take()) for m in messages]
+    pooled_encrypt = (time.perf_counter() - start) / rounds * 1000
+
+    start = time.perf_counter()
+    plain = [private_key.decrypt(c) for c in ciphertexts]
+    crt_decrypt = (time.perf_counter() - start) / rounds * 1000
+
+    total = public_key.add(ciphertexts[0], ciphertexts[1])
+    correct = (plain == messages and old_plain == messages and
+               private_key.decrypt(old_ciphertexts[0]) == 1 and Paillier.decrypt(sk, pk, total) == 3)
+    print(f"密钥生成: {keygen_time:.1f} s（n为 {public_key.n.bit_length()} 比特）")
+    print(f"GPC.Paillier: 加密 {old_encrypt:.2f} ms, 解密 {old_decrypt:.2f} ms")
+    print(f"g = n + 1捷径加密: {shortcut_encrypt:.2f} ms")
+    print(f"r^n池（CRT预计算 {fill_time:.2f} ms/个）在线加密: {pooled_encrypt:.3f} ms")
+    print(f"CRT解密: {crt_decrypt:.2f} ms, 加速比 {old_decrypt / crt_decrypt:.1f}x")
+    print(f"结果正确: {correct}")
+
+
+if __name__ == "__main__":
+    benchmark_primes()
+    benchmark()
@@ -0,0 +1,193 @@
+import argparse
+import hashlib
+import json
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import GPC
+import bigint_backend
+import gpc_wire
+from gpc_hash import hash_to_curve_many
+from gpc_index import ciphertext_size
+from gpc_paillier import generate_keypair
+from sm2_field import n
+from sm2_ladder import ladder, ladder_x, encode_x, decode_x
+from sm3_drbg import randbelow
+
+# GPC端到端扩展性基准：合成凭据集和泄露库，按泄露库行数分别计时协议各步骤，并记录峰值内存和消息字节数。
+# 各步骤与GPC.user_step1/server_step2/user_step3/server_step4相同，只是把server_step2拆开计时。
+# 用法: python gpc_scaling.py [--rows 1000,10000,100000,1000000] [--users 100] [--paillier-bits 2048] [--output r.json]
+# 注意：GPC.Paillier.encrypt每行一次（4096比特n约0.1 s），10^5行以上的规模需要数小时，可用--paillier-bits缩小n
+
+STEPS = ('hash_to_curve', 'blinding', 'paillier_encrypt', 'shuffle', 'intersection', 'decryption')
+_RSS_UNIT = 1 if sys.platform == 'darwin' else 1024  # ru_maxrss在Linux上以KB为单位，macOS上以字节为单位
+
+
+def max_rss():
+    """进程至今的最大常驻内存（字节）；规模从小到大运行时即为当前规模的峰值"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT
+
+
+def synthetic_inputs(rows, users, leaked):
+    """users条凭据，其中前leaked条出现在rows行的泄露库中；返回(凭据, 泄露库, 期望的匹配次数)"""
+    credentials = [(f"user{i}", f"pass{i}") for i in range(users)]
+    leaked_db = [(hashlib.sha256(f"leak{i}".encode()).digest(), i % 100 + 1) for i in range(rows - leaked)]
+    leaked_db += [(GPC.credential_hash(u, pw), i + 1) for i, (u, pw) in enumerate(credentials[:leaked])]
+    random.shuffle(leaked_db)
+    return credentials, leaked_db, leaked * (leaked + 1) // 2
+
+
+def run_size(rows, users, paillier_pk, paillier_sk, trace_memory=False):
+    """对一个规模运行一次完整协议，返回可序列化为JSON的结果
+
+    trace_memory为True时另用tracemalloc统计协议本身的Python内存峰值（大数运算分配频繁，计时会慢数倍）。
+    """
+    leaked = min(rows, max(1, users // 10))
+    credentials, leaked_db, expected = synthetic_inputs(rows, users, leaked)
+    k1 = randbelow(n - 1) + 1
+    k2 = randbelow(n - 1) + 1
+    steps = dict.fromkeys(STEPS, 0.0)
+
+    @contextmanager
+    def step(name):
+        start = time.perf_counter()
+        yield
+        steps[name] += time.perf_counter() - start
+
+    if trace_memory:
+        tracemalloc.start()
+    total = time.perf_counter()
+
+    # user_step1（哈希到曲线不使用进程级缓存，各规模互不影响）
+    with step('hash_to_curve'):
+        user_points = hash_to_curve_many((GPC.credential_hash(u, pw) for u, pw in credentials), cache=None)
+    with step('blinding'):
+        msg1 = [encode_x(ladder(k1, P)) for P in user_points]
+    with step('shuffle'):
+        random.shuffle(msg1)
+
+    # server_step2
+    with step('blinding'):
+        msg2_part1 = [encode_x(ladder_x(k2, decode_x(x))) for x in msg1]
+    with step('hash_to_curve'):
+        points = hash_to_curve_many((cred_hash for cred_hash, _ in leaked_db), cache=None)
+    with step('blinding'):
+        xs = [encode_x(ladder(k2, P)) for P in points]
+    del points
+    with step('paillier_encrypt'):
+        ciphertexts = [GPC.Paillier.encrypt(paillier_pk, count) for _, count in leaked_db]
+    with step('shuffle'):
+        msg2_part2 = list(zip(xs, ciphertexts))
+        del xs, ciphertexts
+        random.shuffle(msg2_part1)
+        random.shuffle(msg2_part2)
+    msg2 = (msg2_part1, msg2_part2)
+
+    # user_step3：每行一次k1乘法、指纹集合查询，匹配行做同态加法
+    with step('intersection'):
+        msg3 = GPC.user_step3(msg2, k1, paillier_pk)
+    # server_step4
+    with step('decryption'):
+        result = GPC.server_step4(msg3, paillier_sk, paillier_pk)
+
+    total = time.perf_counter() - total
+    peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    if trace_memory:
+        tracemalloc.stop()
+
+    # 消息按gpc_wire编码计算字节数；msg2的记录部分按定长计算，不实际拼接
+    ct_size = ciphertext_size(paillier_pk)
+    msg2_bytes = (len(gpc_wire.encode_msg2((msg2_part1, []), ct_size)) +
+                  len(msg2_part2) * (gpc_wire.X_SIZE + ct_size))
+    return {
+        'rows': rows,
+        'users': users,
+        'leaked_users': leaked,
+        'seconds': {name: round(value, 6) for name, value in steps.items()},
+        'total_seconds': round(total, 6),
+        'server_ms_per_row': round((steps['hash_to_curve'] + steps['blinding'] + steps['paillier_encrypt'])
+                                   / rows * 1000, 4),
+        'max_rss_bytes': max_rss(),
+        'tracemalloc_peak_bytes': peak,
+        'message_bytes': {
+            'msg1': len(gpc_wire.encode_msg1(msg1)),
+            'msg2': msg2_bytes,
+            'msg3': len(gpc_wire.encode_msg3(msg3, ct_size)),
+        },
+        'result': int(result),
+        'expected': expected,
+        'correct': int(result) == expected,
+    }
+
+
+def run(sizes, users=100, paillier_bits=2048, trace_memory=False, on_result=None):
+    """从小到大依次运行各规模；on_result(report)在每个规模完成后调用（长时间运行时用于保存中间结果）"""
+    start = time.perf_counter()
+    public_key, private_key = generate_keypair(paillier_bits)
+    keygen = time.perf_counter() - start
+    paillier_pk, paillier_sk = public_key.as_tuple(), private_key.as_tuple()
+    report = {
+        'backend': bigint_backend.BACKEND,
+        'python': sys.version.split()[0],
+        'paillier_n_bits': int(public_key.n).bit_length(),
+        'paillier_keygen_seconds': round(keygen, 3),
+        'tracemalloc': trace_memory,
+        'results': [],
+    }
+    for rows in sorted(sizes):
+        report['results'].append(run_size(rows, users, paillier_pk, paillier_sk, trace_memory))
+        if on_result is not None:
+            on_result(report)
+    return report
+
+
+def print_table(report, file=sys.stderr):
+    print(f"后端: {report['backend']}, Python {report['python']}, Paillier n {report['paillier_n_bits']} 比特"
+          f"{'（计时含tracemalloc开销）' if report['tracemalloc'] else ''}", file=file)
+    print(f"{'行数':>9}" + ''.join(f"{name:>17}" for name in STEPS) +
+          f"{'RSS MB':>9}{'msg2 MB':>9}  正确", file=file)
+    for r in report['results']:
+        print(f"{r['rows']:>9}" + ''.join(f"{r['seconds'][name]:>16.3f}s" for name in STEPS) +
+              f"{r['max_rss_bytes'] / 2 ** 20:>9.1f}{r['message_bytes']['msg2'] / 2 ** 20:>9.2f}  {r['correct']}",
+              file=file)
+
+
+def benchmark(sizes=(100, 1000), users=20, paillier_bits=256):
+    # 小规模快速运行：512比特n，加密开销不掩盖其他步骤
+    print_table(run(sizes, users, paillier_bits), file=sys.stdout)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GPC协议随泄露库规模的分步骤计时、峰值内存和消息字节数")
+    parser.add_argument('--rows', default='1000,10000,100000,1000000', help="逗号分隔的泄露库行数")
+    parser.add_argument('--users', type=int, default=100, help="客户端凭据数（其中十分之一在泄露库中）")
+    parser.add_argument('--paillier-bits', type=int, default=2048, help="Paillier素数比特数（n为其两倍）")
+    parser.add_argument('--tracemalloc', action='store_true', help="另用tracemalloc统计协议的内存峰值（计时会慢数倍）")
+    parser.add_argument('--output', help="JSON结果文件，每完成一个规模更新一次（默认结束时输出到stdout）")
+    args = parser.parse_args(argv)
+
+    try:
+        sizes = [int(rows) for rows in args.rows.split(',') if rows]
+    except ValueError:
+        parser.error("--rows必须是逗号分隔的整数")
+    if not sizes or min(sizes) < 1 or args.users < 1:
+        parser.error("行数和凭据数必须为正整数")
+
+    def save(report):
+        print_table({**report, 'results': report['results'][-1:]})
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(report, ensure_ascii=False, indent=2) + '\n')
+
+    report = run(sizes, args.users, args.paillier_bits, args.tracemalloc, save)
+    print_table(report)
+    if not args.output:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import random
+import struct
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import GPC
+import gpc_wire
+from sm2_ladder import ladder_x, encode_x, decode_x
+from gpc_index import LeakedIndex, build_index, prefix_bits_for, user_step1
+from gpc_paillier import PaillierPublicKey, PaillierPrivateKey
+from sm2_field import n
+from sm3_drbg import randbelow
+
+# 帧：1字节类型 + 4字节长度（大端） + 负载；协议消息本身用gpc_wire编码
+# HELLO    服务器 -> 客户端：prefix_bits(1) || ct_size(4) || Paillier n
+# QUERY    客户端 -> 服务器：桶数(4) || 桶编号(各4) || gpc_wire MSG1
+# RESPONSE 服务器 -> 客户端：gpc_wire MSG2（part2直接取自索引桶的记录）
+# SUM      客户端 -> 服务器：gpc_wire MSG3
+# RESULT   服务器 -> 客户端：匹配次数(8)
+# ERROR    服务器 -> 客户端：UTF-8错误信息
+HELLO, QUERY, RESPONSE, SUM, RESULT, ERROR = range(1, 7)
+_FRAME = struct.Struct('>BI')
+_U32 = struct.Struct('>I')
+MAX_FRAME = 64 * 1024 * 1024
+MAX_RESULT = (1 << 64) - 1  # RESULT帧的匹配次数为8字节
+
+# 工作进程内的服务器密钥（initializer在进程启动时设置一次）
+_worker = {}
+
+
+def _init_worker(k2, p, q):
+    public_key = PaillierPublicKey(p * q)
+    _worker['k2'] = k2
+    _worker['private_key'] = PaillierPrivateKey(public_key, p, q)
+
+
+def _blind(xs):
+    """msg2_part1：客户端元素乘k2后打乱
+
+    k2是整个周期的密钥，用XZ阶梯ladder_x，不用按k2的零窗口分支的定窗口乘法。
+    """
+    part1 = [encode_x(ladder_x(_worker['k2'], decode_x(x))) for x in xs]
+    random.shuffle(part1)
+    return part1
+
+
+def _decrypt(ciphertext):
+    return int(_worker['private_key'].decrypt(ciphertext))
+
+
+async def read_frame(reader):
+    kind, length = _FRAME.unpack(await reader.readexactly(_FRAME.size))
+    if length > MAX_FRAME:
+        raise ValueError("帧过大")
+    return kind, await reader.readexactly(length)
+
+
+def write_frame(writer, kind, *parts):
+    writer.write(_FRAME.pack(kind, sum(len(part) for part in parts)))
+    for part in parts:
+        writer.write(part)
+
+
+async def _write_error(writer, message):
+    """发送ERROR帧；连接已断开时忽略"""
+    try:
+        write_frame(writer, ERROR, message.encode('utf-8'))
+        await writer.drain()
+    except ConnectionError:
+        pass
+
+
+class GPCServer:
+    """asyncio GPC服务器
+
+    泄露库索引（只读内存映射）和Paillier密钥由所有连接共享；k2盲化和解密在进程池中执行，
+    事件循环只负责收发和读取桶。一个连接上可以连续发起多次查询。
+    """
+
+    def __init__(self, index_path, k2, private_key, workers=None):
+        self.index = LeakedIndex(index_path)
+        self.public_key = private_key.public_key
+        self.ct_size = self.index.ct_size
+        self._hello = (bytes([self.index.prefix_bits]) + _U32.pack(self.ct_size) +
+                       int(self.public_key.n).to_bytes((self.public_key.n.bit_length() + 7) // 8, 'big'))
+        # 用spawn启动工作进程：fork出的进程会继承已接受连接的套接字，客户端关闭后服务器收不到EOF
+        self._executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                             mp_context=multiprocessing.get_context('spawn'),
+                                             initializer=_init_worker,
+                                             initargs=(k2, int(private_key.p), int(private_key.q)))
+        self.queries = 0
+        self._connections = set()
+
+    async def handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            write_frame(writer, HELLO, self._hello)
+            while True:
+                try:
+                    kind, payload = await read_frame(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                if kind != QUERY:
+                    raise ValueError("需要QUERY帧")
+
+                prefix_count, = _U32.unpack_from(payload, 0)
+                if _U32.size * (1 + prefix_count) > len(payload):
+                    raise ValueError("消息被截断")
+                prefixes = sorted(set(struct.unpack_from(f'>{prefix_count}I', payload, _U32.size)))
+                msg1 = gpc_wire.decode_as(memoryview(payload)[_U32.size * (1 + prefix_count):], gpc_wire.MSG1)
+                if msg1.width != gpc_wire.X_SIZE:
+                    raise ValueError("元素必须为32字节x坐标")
+                if len(prefixes) > max(len(msg1), 1):
+                    raise ValueError("请求的桶数超过凭据数")
+                buckets = [self.index.bucket_bytes(prefix) for prefix in prefixes]
+                part1 = await loop.run_in_executor(self._executor, _blind, [bytes(x) for x in msg1])
+                write_frame(writer, RESPONSE, *gpc_wire.msg2_parts(part1, buckets, self.ct_size))
+                await writer.drain()
+
+                kind, payload = await read_frame(reader)
+                if kind != SUM:
+                    raise ValueError("需要SUM帧")
+                ciphertext = gpc_wire.decode_as(payload, gpc_wire.MSG3, self.ct_size)
+                if ciphertext >= self.public_key.n2:
+                    raise ValueError("密文超出范围")
+                result = await loop.run_in_executor(self._executor, _decrypt, ciphertext) if ciphertext else 0
+                if not 0 <= result <= MAX_RESULT:
+                    raise ValueError("解密结果超出匹配次数范围")  # 客户端构造的密文，不是同态求和的结果
+                write_frame(writer, RESULT, result.to_bytes(8, 'big'))
+                await writer.drain()
+                self.queries += 1
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # 客户端中途断开
+        except (ValueError, struct.error) as e:
+            await _write_error(writer, str(e))
+        except Exception as e:
+            await _write_error(writer, f"服务器内部错误: {type(e).__name__}")  # 不回传异常详情
+        finally:
+            writer.close()
+            self._connections.discard(task)
+
+    async def start(self, host='127.0.0.1', port=0):
+        """开始监听，返回asyncio.Server（port=0时由系统分配端口）"""
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def close(self):
+        """等待现有连接结束后关闭进程池和索引（桶的memoryview引用映射区，须先释放）"""
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        self._executor.shutdown()
+        self.index.close()
+
+
+def _client_step1(credentials, prefix_bits):
+    k1 = randbelow(n - 1) + 1
+    return (k1, *user_step1(credentials, k1, prefix_bits))
+
+
+def _client_step3(payload, k1, paillier_pk, ct_size):
+    """同态求和后再乘一个新的Enc(0)：索引中的密文在整个周期内复用，未重新随机化的和
+    （只有一条匹配时就是索引中的某条记录）会让服务器认出匹配了哪些行"""
+    sum_enc = GPC.user_step3(gpc_wire.decode_as(payload, gpc_wire.MSG2, ct_size), k1, paillier_pk)
+    public_key = PaillierPublicKey.from_tuple(paillier_pk)
+    fresh = public_key.encrypt(0)
+    return gpc_wire.encode_msg3(public_key.add(sum_enc, fresh) if sum_enc else fresh, ct_size)
+
+
+class GPCClient:
+    """GPC客户端连接；executor不为None时把客户端的盲化计算放到该执行器中"""
+
+    def __init__(self, reader, writer, prefix_bits, ct_size, paillier_pk, executor=None):
+        self._reader = reader
+        self._writer = writer
+        self.prefix_bits = prefix_bits
+        self.ct_size = ct_size
+        self.paillier_pk = paillier_pk
+        self._executor = executor
+
+    @classmethod
+    async def connect(cls, host, port, executor=None):
+        reader, writer = await asyncio.open_connection(host, port)
+        kind, payload = await read_frame(reader)
+        if kind != HELLO:
+            raise ValueError("需要HELLO帧")
+        prefix_bits = payload[0]
+        ct_size, = _U32.unpack_from(payload, 1)
+        public_key = PaillierPublicKey(int.from_bytes(payload[5:], 'big'))
+        return cls(reader, writer, prefix_bits, ct_size, public_key.as_tuple(), executor)
+
+    async def _expect(self, kind):
+        received, payload = await read_frame(self._reader)
+        if received == ERROR:
+            raise ValueError(f"服务器错误: {payload.decode('utf-8')}")
+        if received != kind:
+            raise ValueError("帧类型不符")
+        return payload
+
+    async def query(self, credentials):
+        """对一组(用户名, 密码)执行一次完整协议，返回泄露匹配次数"""
+        loop = asyncio.get_running_loop()
+        k1, prefixes, msg1 = await loop.run_in_executor(self._executor, _client_step1,
+                                                        list(credentials), self.prefix_bits)
+        write_frame(self._writer, QUERY, _U32.pack(len(prefixes)), struct.pack(f'>{len(prefixes)}I', *prefixes),
+                    *gpc_wire.msg1_parts(msg1))
+        await self._writer.drain()
+
+        payload = await self._expect(RESPONSE)
+        ciphertext = await loop.run_in_executor(self._executor, _client_step3, payload, k1,
+                                                self.paillier_pk, self.ct_size)
+        write_frame(self._writer, SUM, ciphertext)
+        await self._writer.drain()
+        return int.from_bytes(await self._expect(RESULT), 'big')
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+async def _run_clients(port, clients, queries, credential_sets, executor):
+    latencies = []
+
+    async def client(i):
+        connection = await GPCClient.connect('127.0.0.1', port, executor)
+        results = []
+        for j in range(queries):
+            start = time.perf_counter()
+            results.append(await connection.query(credential_sets[(i + j) % len(credential_sets)]))
+            latencies.append(time.perf_counter() - start)
+        await connection.close()
+        return results
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(client(i) for i in range(clients)))
+    return time.perf_counter() - start, sorted(latencies), results
+
+
+async def _benchmark(index_path, k2, private_key, credential_sets, expected, queries, workers):
+    server = GPCServer(index_path, k2, private_key, workers)
+    listener = await server.start()
+    port = listener.sockets[0].getsockname()[1]
+    # 客户端的盲化计算放在另一个进程池中，模拟独立的客户端机器
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as client_executor:
+        await _run_clients(port, 1, 1, credential_sets, client_executor)  # 预热：启动两边的工作进程
+        for clients in (1, 2, 4, 8):
+            elapsed, latencies, results = await _run_clients(port, clients, queries, credential_sets, client_executor)
+            total = clients * queries
+            correct = all(result == expected[(i + j) % len(expected)]
+                          for i, row in enumerate(results) for j, result in enumerate(row))
+            print(f"{clients} 个并发客户端: {total / elapsed:.1f} 次查询/秒, "
+                  f"p50 {latencies[len(latencies) // 2] * 1000:.0f} ms, "
+                  f"p99 {latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1000:.0f} ms, "
+                  f"结果正确: {correct}")
+    listener.close()
+    await listener.wait_closed()
+    await server.close()
+
+
+def benchmark(rows=40, queries=3, workers=None):
+    from gpc_paillier import generate_keypair
+
+    workers = workers or os.cpu_count() or 1
+    k2 = randbelow(n - 1) + 1
+    public_key, private_key = generate_keypair()
+    credential_sets = [[(f"user{i}", f"pass{i}"), (f"user{i + 1}", f"pass{i + 1}")] for i in range(4)]
+    leaked_db = [(hashlib.sha256(f"leak{i}:{i}".encode()).digest(), i % 7 + 1) for i in range(rows)]
+    leaked_db += [(GPC.credential_hash(f"user{i}", f"pass{i}"), 10 + i) for i in range(0, 5, 2)]
+    counts = {cred_hash: count for cred_hash, count in leaked_db}
+    expected = [sum(counts.get(GPC.credential_hash(u, pw), 0) for u, pw in creds) for creds in credential_sets]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'gpc_server.idx')
+        start = time.perf_counter()
+        build_index(path, leaked_db, k2, public_key.as_tuple(), prefix_bits=prefix_bits_for(len(leaked_db), 4),
+                    paillier_sk=private_key)
+        print(f"离线构建索引（{len(leaked_db)} 条）: {time.perf_counter() - start:.1f} s, 工作进程: {workers}")
+        asyncio.run(_benchmark(path, k2, private_key, credential_sets, expected, queries, workers))
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,160 @@
+import hashlib
+import os
+import time
+import tracemalloc
+
+import GPC
+from sm2_ladder import ladder, ladder_x, encode_x, decode_x
+from gpc_hash import hash_to_curve_many
+from gpc_fingerprint import FingerprintSet
+
+# 流式GPC：各步骤按固定大小的块产生和消费消息，不构建整库大小的列表
+# 泄露库一侧的内存占用为O(chunk)；客户端集合在user_step3中仍需完整保存以做成员判断（每个元素约16字节指纹）
+CHUNK_SIZE = 1024
+
+
+class IndexPermutation:
+    """[0, size)上的带密钥伪随机置换：4轮Feistel + 循环行走（cycle walking）
+
+    第i个位置的值可以单独计算，不需要保存整个排列，输出可按块流式产生；
+    代替random.shuffle对整个列表的原地洗牌。
+    """
+    ROUNDS = 4
+
+    def __init__(self, size, key=None):
+        self.size = size
+        self.key = key if key is not None else os.urandom(16)
+        bits = max(2, (size - 1).bit_length())
+        self._half = (bits + 1) // 2
+        self._mask = (1 << self._half) - 1
+
+    def _round(self, i, value):
+        digest = hashlib.blake2b(bytes([i]) + value.to_bytes(8, 'big'), digest_size=8, key=self.key).digest()
+        return int.from_bytes(digest, 'big') & self._mask
+
+    def _encrypt(self, x):
+        left, right = x >> self._half, x & self._mask
+        for i in range(self.ROUNDS):
+            left, right = right, left ^ self._round(i, right)
+        return (left << self._half) | right
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.size:
+            raise IndexError("置换下标超出范围")
+        x = self._encrypt(i)
+        while x >= self.size:  # 定义域是2的偶数次幂，落在[size, 2^bits)时继续加密直到回到范围内
+            x = self._encrypt(x)
+        return x
+
+    def __iter__(self):
+        for i in range(self.size):
+            yield self[i]
+
+
+def permuted_chunks(sequence, chunk_size=CHUNK_SIZE, key=None):
+    """按随机置换顺序分块读取可随机访问的序列，每次只持有一个块"""
+    order = IndexPermutation(len(sequence), key)
+    for start in range(0, len(sequence), chunk_size):
+        yield [sequence[order[i]] for i in range(start, min(start + chunk_size, len(sequence)))]
+
+
+def user_step1(credentials, k1, chunk_size=CHUNK_SIZE):
+    """与GPC.user_step1等价，按块产生x(k1·H(u))"""
+    for chunk in permuted_chunks(credentials, chunk_size):
+        cred_hashes = [GPC.credential_hash(username, password) for username, password in chunk]
+        yield [encode_x(ladder(k1, P)) for P in hash_to_curve_many(cred_hashes)]
+
+
+def server_step2_part1(msg1, k2, chunk_size=CHUNK_SIZE):
+    """msg2_part1：msg1（可随机访问的x序列）按置换顺序乘k2"""
+    for chunk in permuted_chunks(msg1, chunk_size):
+        yield [encode_x(ladder_x(k2, decode_x(x))) for x in chunk]
+
+
+def server_step2_part2(leaked_db, k2, paillier_pk, chunk_size=CHUNK_SIZE):
+    """msg2_part2：泄露库（可随机访问的(cred_hash, count)序列）按置换顺序逐块计算(x(k2·H(w)), Enc(count))
+
+    哈希到曲线不写入进程级缓存，避免整库扫描把客户端常用条目挤出LRU。
+    """
+    for chunk in permuted_chunks(leaked_db, chunk_size):
+        points = hash_to_curve_many((cred_hash for cred_hash, _ in chunk), cache=None)
+        yield [(encode_x(ladder(k2, P)), GPC.Paillier.encrypt(paillier_pk, count))
+               for (_, count), P in zip(chunk, points)]
+
+
+def index_chunks(index, chunk_size=CHUNK_SIZE, prefixes=None):
+    """从gpc_index.LeakedIndex分块读取msg2_part2（索引已按盲化后的x排序，无需再置换）"""
+    if prefixes is None:
+        ranges = [(0, len(index))]
+    else:
+        ranges = [index.bucket_range(prefix) for prefix in sorted(set(prefixes))]
+    for start, stop in ranges:
+        for offset in range(start, stop, chunk_size):
+            yield [index.record(i) for i in range(offset, min(offset + chunk_size, stop))]
+
+
+def server_step2(leaked_db, msg1, k2, paillier_pk, chunk_size=CHUNK_SIZE):
+    """返回(part1块迭代器, part2块迭代器)，两部分都按需计算"""
+    return (server_step2_part1(msg1, k2, chunk_size),
+            server_step2_part2(leaked_db, k2, paillier_pk, chunk_size))
+
+
+def user_step3(msg2, k1, paillier_pk):
+    """消费server_step2的两个块迭代器，返回匹配计数的密文之和（无匹配时为0）"""
+    part1, part2 = msg2
+    user_set = FingerprintSet(x for chunk in part1 for x in chunk)
+    sum_enc = 0
+    for chunk in part2:
+        for x, enc_count in chunk:
+            if user_set.contains_x(ladder_x(k1, decode_x(x))):
+                sum_enc = enc_count if sum_enc == 0 else GPC.Paillier.add(paillier_pk, sum_enc, enc_count)
+    return sum_enc
+
+
+def run(credentials, leaked_db, k1, k2, paillier_pk, paillier_sk, chunk_size=CHUNK_SIZE):
+    """完整流式协议；msg1只有|U|个元素，由服务器按随机访问读取"""
+    msg1 = [x for chunk in user_step1(credentials, k1, chunk_size) for x in chunk]
+    msg2 = server_step2(leaked_db, msg1, k2, paillier_pk, chunk_size)
+    return GPC.server_step4(user_step3(msg2, k1, paillier_pk), paillier_sk, paillier_pk)
+
+
+def _run_batch(credentials, leaked_db, k1, k2, paillier_pk, paillier_sk):
+    msg1 = GPC.user_step1(credentials, k1)
+    msg2 = GPC.server_step2(leaked_db, msg1, k2, paillier_pk)
+    return GPC.server_step4(GPC.user_step3(msg2, k1, paillier_pk), paillier_sk, paillier_pk)
+
+
+def benchmark(rows=2000, chunk_size=256):
+    from gpc_paillier import generate_keypair
+    from sm3_drbg import randbelow
+    from sm2_field import n
+
+    # 用512比特的n测试内存和正确性，加密开销不掩盖盲化和集合部分
+    public_key, private_key = generate_keypair(256, workers=1)
+    paillier_pk, paillier_sk = public_key.as_tuple(), private_key.as_tuple()
+    k1 = randbelow(n - 1) + 1
+    k2 = randbelow(n - 1) + 1
+    credentials = [(f"user{i}", f"pass{i}") for i in range(20)]
+    leaked_db = [(hashlib.sha256(f"leak{i}:{i}".encode()).digest(), i % 7 + 1) for i in range(rows)]
+    leaked_db += [(GPC.credential_hash(u, pw), 5) for u, pw in credentials[::4]]
+
+    results = {}
+    for name, func in (("批量", lambda: _run_batch(credentials, leaked_db, k1, k2, paillier_pk, paillier_sk)),
+                       ("流式", lambda: run(credentials, leaked_db, k1, k2, paillier_pk, paillier_sk, chunk_size))):
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[name] = result
+        print(f"{name}协议（{len(leaked_db)} 条）: {elapsed:.2f} s（含tracemalloc开销）, 峰值内存 {peak / 1024:.0f} KB, "
+              f"匹配次数 {result}")
+    print(f"结果一致: {results['批量'] == results['流式']}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,242 @@
+import os
+import pickle
+import struct
+import time
+
+from sm2_codec import COMPRESSED_SIZE, encode_point
+from sm2_curve import generate_key_pairs
+from sm2_ladder import encode_x
+
+# GPC消息的二进制编码（版本1），整数一律大端
+# 头部：'GPCW'(4) || 版本(1) || 消息类型(1) || 元素宽度(1) || 密文宽度(4)
+# 批：条数(4) || 条数个定长条目
+# MSG1：头部 || 批(元素)
+# MSG2：头部 || 批(元素) || 批(元素 || 密文)
+# MSG3：头部 || 密文（无匹配时为空）
+# 元素宽度32为x坐标编码（sm2_ladder.encode_x，GPC使用），33为SEC1压缩点（sm2_codec.encode_point）
+WIRE_MAGIC = b'GPCW'
+WIRE_VERSION = 1
+MSG1, MSG2, MSG3 = 1, 2, 3
+X_SIZE = 32
+POINT_SIZE = COMPRESSED_SIZE
+_HEADER = struct.Struct('>4sBBBI')
+_COUNT = struct.Struct('>I')
+
+
+class FixedWidthView:
+    """定长条目序列：按需从接收缓冲区切出memoryview，不复制数据
+
+    只读的字节memoryview可哈希且与相同内容的bytes相等，可直接放进set或与bytes比较。
+    """
+
+    def __init__(self, view, width):
+        self._view = view
+        self.width = width
+
+    def __len__(self):
+        return len(self._view) // self.width
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError("下标超出范围")
+        return self._view[i * self.width:(i + 1) * self.width]
+
+    def __iter__(self):
+        view, width = self._view, self.width
+        for offset in range(0, len(view), width):
+            yield view[offset:offset + width]
+
+
+class RecordView(FixedWidthView):
+    """msg2_part2：第i项为(元素的memoryview, 密文整数)，密文在访问时才转换为整数"""
+
+    def __init__(self, view, element_size, ct_size):
+        super().__init__(view, element_size + ct_size)
+        self.element_size = element_size
+
+    def _record(self, offset):
+        split = offset + self.element_size
+        return self._view[offset:split], int.from_bytes(self._view[split:offset + self.width], 'big')
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError("下标超出范围")
+        return self._record(i * self.width)
+
+    def __iter__(self):
+        for offset in range(0, len(self._view), self.width):
+            yield self._record(offset)
+
+
+def _header(kind, element_size, ct_size):
+    return _HEADER.pack(WIRE_MAGIC, WIRE_VERSION, kind, element_size, ct_size)
+
+
+def _batch(data, count, width):
+    if len(data) != count * width:
+        raise ValueError(f"条目长度必须为{width}字节")
+    return [_COUNT.pack(count), data]
+
+
+def encode_records(part2, ct_size, element_size=X_SIZE):
+    """(元素编码, 密文整数)列表 -> 连续的定长记录"""
+    data = b''.join([element + int(ciphertext).to_bytes(ct_size, 'big') for element, ciphertext in part2])
+    if len(data) != (element_size + ct_size) * len(part2):
+        raise ValueError(f"元素编码必须为{element_size}字节")
+    return data
+
+
+def msg1_parts(msg1, element_size=X_SIZE):
+    """MSG1的各段缓冲区，可逐段写入套接字而不拼接"""
+    return [_header(MSG1, element_size, 0)] + _batch(b''.join(msg1), len(msg1), element_size)
+
+
+def msg2_parts(part1, records, ct_size, element_size=X_SIZE):
+    """MSG2的各段缓冲区；records为若干段已编码的定长记录（如encode_records的结果或索引桶的memoryview）"""
+    record_size = element_size + ct_size
+    total = sum(len(chunk) for chunk in records)
+    if total % record_size:
+        raise ValueError(f"记录长度必须为{record_size}字节")
+    return ([_header(MSG2, element_size, ct_size)] + _batch(b''.join(part1), len(part1), element_size) +
+            [_COUNT.pack(total // record_size)] + list(records))
+
+
+def encode_msg1(msg1, element_size=X_SIZE):
+    return b''.join(msg1_parts(msg1, element_size))
+
+
+def encode_msg2(msg2, ct_size, element_size=X_SIZE):
+    part1, part2 = msg2
+    return b''.join(msg2_parts(part1, [encode_records(part2, ct_size, element_size)], ct_size, element_size))
+
+
+def encode_msg3(sum_enc, ct_size):
+    """sum_enc为0（无匹配）时编码为空密文"""
+    return _header(MSG3, 0, ct_size) + (int(sum_enc).to_bytes(ct_size, 'big') if sum_enc else b'')
+
+
+def _read_batch(view, offset, width):
+    if offset + _COUNT.size > len(view):
+        raise ValueError("消息被截断")
+    count, = _COUNT.unpack_from(view, offset)
+    start = offset + _COUNT.size
+    end = start + count * width
+    if end > len(view):
+        raise ValueError("消息被截断")
+    return view[start:end], end
+
+
+def decode(buffer, expected_ct_size=None):
+    """解析一条消息，返回(消息类型, 消息)
+
+    MSG1为FixedWidthView，MSG2为(FixedWidthView, RecordView)，MSG3为密文整数（无匹配时为0）；
+    前两者引用buffer，使用期间buffer不能被修改或释放。
+    给出expected_ct_size时，MSG2、MSG3头部的密文宽度必须与之相同（宽度取自对方发来的头部，不可信）。
+    """
+    view = memoryview(buffer).cast('B')
+    if len(view) < _HEADER.size:
+        raise ValueError("消息被截断")
+    magic, version, kind, element_size, ct_size = _HEADER.unpack_from(view, 0)
+    if magic != WIRE_MAGIC:
+        raise ValueError("不是GPC消息")
+    if version != WIRE_VERSION:
+        raise ValueError(f"不支持的消息版本: {version}")
+    offset = _HEADER.size
+    if expected_ct_size is not None and kind in (MSG2, MSG3) and ct_size != expected_ct_size:
+        raise ValueError("密文宽度不符")
+
+    if kind == MSG3:
+        ciphertext = view[offset:]
+        if len(ciphertext) not in (0, ct_size):
+            raise ValueError("密文长度不符")
+        return kind, int.from_bytes(ciphertext, 'big')
+    if element_size not in (X_SIZE, POINT_SIZE):
+        raise ValueError(f"不支持的元素宽度: {element_size}")
+    elements, offset = _read_batch(view, offset, element_size)
+    if kind == MSG1:
+        message = FixedWidthView(elements, element_size)
+    elif kind == MSG2:
+        records, offset = _read_batch(view, offset, element_size + ct_size)
+        message = (FixedWidthView(elements, element_size), RecordView(records, element_size, ct_size))
+    else:
+        raise ValueError(f"未知的消息类型: {kind}")
+    if offset != len(view):
+        raise ValueError("消息末尾有多余数据")
+    return kind, message
+
+
+def decode_as(buffer, kind, expected_ct_size=None):
+    """解析并检查消息类型（及密文宽度）"""
+    received, message = decode(buffer, expected_ct_size)
+    if received != kind:
+        raise ValueError("消息类型不符")
+    return message
+
+
+def benchmark(rows=2000, ct_size=1024, rounds=5):
+    # 时间只与条目数和宽度有关：用随机点和随机“密文”（4096比特n对应1024字节）代替真实的协议消息
+    points = [P for _, P in generate_key_pairs(rows)]
+    ciphertexts = [int.from_bytes(os.urandom(ct_size), 'big') for _ in range(rows)]
+    tuple_msg = (points, list(zip(points, ciphertexts)))  # 原GPC的(x, y)整数元组表示
+    x_msg = ([encode_x(x) for x, _ in points], [(encode_x(x), c) for (x, _), c in zip(points, ciphertexts)])
+    point_msg = ([encode_point(P) for P in points], [(encode_point(P), c) for P, c in zip(points, ciphertexts)])
+
+    def measure(encode, decode, consume):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            data = encode()
+        encode_time = (time.perf_counter() - start) / rounds * 1000
+        start = time.perf_counter()
+        for _ in range(rounds):
+            decode(data)
+        decode_time = (time.perf_counter() - start) / rounds * 1000
+        start = time.perf_counter()
+        for _ in range(rounds):
+            consume(decode(data))
+        consume_time = (time.perf_counter() - start) / rounds * 1000
+        return len(data), encode_time, decode_time, consume_time
+
+    def consume1(msg1):
+        for _ in msg1:
+            pass
+
+    def consume2(msg2):
+        # 与解码后的使用方式一致：遍历两部分，密文转换为整数
+        consume1(msg2[0])
+        for _ in msg2[1]:
+            pass
+
+    loads = pickle.loads
+    dumps = lambda message: lambda: pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+    cases = {
+        "msg1": {
+            "pickle(整数元组)": (dumps(points), loads, consume1),
+            "pickle(32字节x)": (dumps(x_msg[0]), loads, consume1),
+            "gpc_wire(32字节x)": (lambda: encode_msg1(x_msg[0]), lambda data: decode_as(data, MSG1), consume1),
+            "gpc_wire(33字节压缩点)": (lambda: encode_msg1(point_msg[0], POINT_SIZE),
+                                  lambda data: decode_as(data, MSG1), consume1),
+        },
+        "msg2": {
+            "pickle(整数元组)": (dumps(tuple_msg), loads, consume2),
+            "pickle(32字节x)": (dumps(x_msg), loads, consume2),
+            "gpc_wire(32字节x)": (lambda: encode_msg2(x_msg, ct_size), lambda data: decode_as(data, MSG2), consume2),
+            "gpc_wire(33字节压缩点)": (lambda: encode_msg2(point_msg, ct_size, POINT_SIZE),
+                                  lambda data: decode_as(data, MSG2), consume2),
+        },
+    }
+    for message, variants in cases.items():
+        print(f"{message}（{rows} 条，密文 {ct_size} 字节）:")
+        for name, (encode, decode, consume) in variants.items():
+            size, encode_time, decode_time, consume_time = measure(encode, decode, consume)
+            print(f"  {name}: {size} 字节, 编码 {encode_time:.2f} ms, 解码 {decode_time:.3f} ms, "
+                  f"解码并遍历 {consume_time:.2f} ms")
+
+    part1, part2 = decode_as(encode_msg2(x_msg, ct_size), MSG2)
+    correct = (list(part1) == x_msg[0] and [(bytes(x), c) for x, c in part2] == x_msg[1] and
+               decode_as(encode_msg3(ciphertexts[0], ct_size), MSG3) == ciphertexts[0] and
+               decode_as(encode_msg3(0, ct_size), MSG3) == 0)
+    print(f"往返结果一致: {correct}")
+
+
+if __name__ == "__main__":
+    benchmark()
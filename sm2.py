@@ -1,6 +1,8 @@
 import os
 import hashlib
 
+from bigint_backend import mpz, invert
+
 # SM2核心参数（文档1-32定义）
 p_hex = "8542D69E4C044F18E8B92435BF6FF7DE457283915C45517D722EDB8B08F1DFC3"
 a_hex = "787968B4FA32C3FD2417842E73BBFEFF2F3C848B6831D7E0EC65228B3937E498"
@@ -9,10 +11,10 @@ n_hex = "8542D69E4C044F18E8B92435BF6FF7DD297720630485628D5AE74EE7C32E79B7"
 Gx_hex = "421DEBD61B62EAB6746434EBC3CC315E32220B3BADDD50BDC4C4E6C147FEDD43D"
 Gy_hex = "0680512BCBB42C07D47349D2153B70C4E5D7FDFCBFA36EA1A85841B9E46E09A2"
 
-p = int(p_hex, 16)
-a = int(a_hex, 16)
-b = int(b_hex, 16)
-n = int(n_hex, 16)
+p = mpz(int(p_hex, 16))
+a = mpz(int(a_hex, 16))
+b = mpz(int(b_hex, 16))
+n = mpz(int(n_hex, 16))
 h = 1  # 余因子（文档1-23）
 G = (int(Gx_hex, 16), int(Gy_hex, 16))  # 基点（文档1-32）
 
@@ -26,16 +28,11 @@ def int_to_32bytes(num):
 
 
 def mod_inverse(a, mod):
-    """扩展欧几里得算法求模逆（文档1-82）"""
-
-    def extended_gcd(a, b):
-        if b == 0:
-            return (a, 1, 0)
-        g, x, y = extended_gcd(b, a % b)
-        return (g, y, x - (a // b) * y)
-
-    g, x, y = extended_gcd(a, mod)
-    return x % mod if g == 1 else None
+    """模逆（gmpy2.invert或内置pow，避免递归扩展欧几里得的深递归）"""
+    try:
+        return invert(a, mod)
+    except ZeroDivisionError:
+        return None
 
 
 def point_add(p1, p2):
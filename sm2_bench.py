@@ -0,0 +1,304 @@
+import argparse
+import cProfile
+import importlib.util
+import json
+import os
+import pstats
+import subprocess
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import bigint_backend
+
+# 统一的SM2实现对比基准：各实现的keygen/sign/verify吞吐、p50/p99延迟，
+# 以及每次调用的模p约减、模逆和点运算次数。
+# 用法: python sm2_bench.py [--rounds N] [--only POC,sm2_keys] [--output r.json] [--profile r.prof]
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ID = "ALICE123@YAHOO.COM"
+MESSAGE = "Hello SM2 - 统一基准测试"
+WARMUP = 2  # 计时前的预热调用（构建固定基表等一次性开销不计入）
+OPERATIONS = ('keygen', 'sign', 'verify')
+
+_counts = Counter()
+
+
+def load_module(name, filename):
+    """按文件路径导入模块（SM2(optimized).py等文件名不是合法模块名）"""
+    module = sys.modules.get(name)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, filename))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return module
+
+
+def _poc(rounds):
+    POC = load_module('POC', 'POC.py')
+    d, P = POC.generate_keypair()
+    signature = POC.sign(MESSAGE, d)
+    return [POC], {
+        'keygen': POC.generate_keypair,
+        'sign': lambda: POC.sign(MESSAGE, d),
+        'verify': lambda: POC.verify(MESSAGE, signature, P),
+    }
+
+
+def _reference(name, filename):
+    """sm2.py与SM2(optimized).py接口相同：(d, PA, ID, message)"""
+    def setup(rounds):
+        module = load_module(name, filename)
+        d, PA = module.generate_key_pair()
+        signature = module.sign(d, PA, ID, MESSAGE)
+        return [module], {
+            'keygen': module.generate_key_pair,
+            'sign': lambda: module.sign(d, PA, ID, MESSAGE),
+            'verify': lambda: module.verify(PA, ID, MESSAGE, signature),
+        }
+    return setup
+
+
+def _sm2_sign(rounds):
+    import sm2_field
+    import sm2_curve
+    import sm2_sign
+
+    (d, PA), = sm2_curve.generate_key_pairs(1)
+    signature = sm2_sign.sign(d, PA, ID, MESSAGE)
+    return [sm2_field, sm2_curve, sm2_sign], {
+        'keygen': lambda: next(sm2_curve.generate_key_pairs(1)),
+        'sign': lambda: sm2_sign.sign(d, PA, ID, MESSAGE),
+        'verify': lambda: sm2_sign.verify(PA, ID, MESSAGE, signature),
+    }
+
+
+def _sm2_keys(rounds):
+    """SigningKey（nonce池预先补满，只测在线签名）与缓存的VerifyingKey"""
+    import sm2_field
+    import sm2_curve
+    import sm2_sign
+    import sm2_keys
+
+    (d, PA), = sm2_curve.generate_key_pairs(1)
+    pool = sm2_keys.NoncePool(capacity=rounds + 2 * WARMUP + 1, low_water=0, background=False)
+    pool.fill()
+    sk = sm2_keys.SigningKey(d, ID, PA, pool=pool)
+    vk = sk.verifying_key()
+    signature = sk.sign(MESSAGE)
+    return [sm2_field, sm2_curve, sm2_sign, sm2_keys], {
+        'keygen': None,  # 与sm2_sign共用sm2_curve.generate_key_pairs
+        'sign': lambda: sk.sign(MESSAGE),
+        'verify': lambda: vk.verify(MESSAGE, signature),
+    }
+
+
+# 名称 -> setup(rounds)，返回(需要插桩的模块, {操作: 无参调用})
+IMPLEMENTATIONS = {
+    'POC': _poc,
+    'sm2': _reference('sm2', 'sm2.py'),
+    'SM2(optimized)': _reference('SM2_optimized', 'SM2(optimized).py'),
+    'sm2_sign': _sm2_sign,
+    'sm2_keys': _sm2_keys,
+}
+
+
+class _CountingModulus(int):
+    """计数用模数：int子类重载了__rmod__，x % p 会优先调用它"""
+
+    def __rmod__(self, other):
+        _counts['field_mul'] += 1
+        return int.__rmod__(self, other)
+
+
+def _counted(func, key):
+    def wrapper(*args, **kwargs):
+        _counts[key] += 1
+        return func(*args, **kwargs)
+    wrapper.__wrapped__ = func
+    return wrapper
+
+
+# 被计数的函数名 -> 计数项；各模块按名字导入的同一函数共用一个包装
+_COUNTED = {
+    'invert': 'inversions',
+    'point_add': 'point_ops',
+    'jacobian_add': 'point_ops',
+    'jacobian_add_affine': 'point_ops',
+    'jacobian_double': 'point_ops',
+}
+
+
+@contextmanager
+def instrumented(modules):
+    """临时替换模块中的p和被计数函数，退出时恢复
+
+    field_mul以“模p约减”次数计：每次域乘法后约减一次，少量加减法的约减也计入，
+    pow(x, e, p)内部的乘法不计入。只在内置int后端下准确（mpz % int子类不会回调__rmod__）。
+    """
+    saved = []
+    wrappers = {}
+    for module in modules:
+        if hasattr(module, 'p'):
+            saved.append((module, 'p', module.p))
+            module.p = _CountingModulus(int(module.p))
+        for name, key in _COUNTED.items():
+            func = getattr(module, name, None)
+            if func is None:
+                continue
+            if id(func) not in wrappers:
+                wrappers[id(func)] = _counted(func, key)
+            saved.append((module, name, func))
+            setattr(module, name, wrappers[id(func)])
+    try:
+        yield
+    finally:
+        for module, name, value in reversed(saved):
+            setattr(module, name, value)
+
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def time_operation(func, rounds):
+    """逐次计时，返回吞吐、延迟分位数和返回值"""
+    for _ in range(WARMUP):
+        func()
+    latencies = []
+    results = []
+    start = time.perf_counter()
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        results.append(func())
+        latencies.append(time.perf_counter() - t0)
+    total = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'rounds': rounds,
+        'ops_per_sec': rounds / total,
+        'mean_ms': total / rounds * 1000,
+        'p50_ms': _percentile(latencies, 0.50) * 1000,
+        'p99_ms': _percentile(latencies, 0.99) * 1000,
+    }, results
+
+
+def count_operation(modules, func, rounds):
+    """插桩后调用rounds次，返回每次调用的平均计数"""
+    func()  # 预热，避免把表构建计入
+    _counts.clear()
+    with instrumented(modules):
+        for _ in range(rounds):
+            func()
+    return {key: _counts[key] / rounds for key in ('field_mul', 'inversions', 'point_ops')}
+
+
+def count_all(names, rounds):
+    counts = {}
+    for name in names:
+        modules, ops = IMPLEMENTATIONS[name](rounds)
+        for op in OPERATIONS:
+            if ops[op] is not None:
+                counts[f"{name}/{op}"] = count_operation(modules, ops[op], rounds)
+    return counts
+
+
+def _count_in_subprocess(names, rounds):
+    """gmpy2后端下无法通过int子类计数，改在BIGINT_BACKEND=int的子进程中统计（计数与后端无关）"""
+    env = dict(os.environ, BIGINT_BACKEND='int')
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--count-only',
+         '--count-rounds', str(rounds), '--only', ','.join(names)],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def run(names, rounds=50, count_rounds=5, profile=None):
+    """运行基准，返回可序列化为JSON的结果；profile为cProfile.Profile时只对计时部分采样"""
+    if bigint_backend.BACKEND == 'int':
+        counts = count_all(names, count_rounds)
+    else:
+        counts = _count_in_subprocess(names, count_rounds)
+
+    results = []
+    for name in names:
+        modules, ops = IMPLEMENTATIONS[name](rounds)
+        for op in OPERATIONS:
+            if ops[op] is None:
+                continue
+            if profile is not None:
+                profile.enable()
+            stats, values = time_operation(ops[op], rounds)
+            if profile is not None:
+                profile.disable()
+            entry = {'implementation': name, 'operation': op, **stats,
+                     'per_call': counts.get(f"{name}/{op}")}
+            if op == 'verify':
+                entry['valid'] = all(values)
+            results.append(entry)
+
+    return {
+        'backend': bigint_backend.BACKEND,
+        'python': sys.version.split()[0],
+        'results': results,
+    }
+
+
+def print_table(report, file=sys.stderr):
+    print(f"后端: {report['backend']}, Python {report['python']}", file=file)
+    print(f"{'实现':<16}{'操作':<8}{'次/秒':>10}{'p50 ms':>10}{'p99 ms':>10}"
+          f"{'模p约减':>10}{'模逆':>8}{'点运算':>8}", file=file)
+    for r in report['results']:
+        c = r['per_call'] or {}
+        note = '' if r.get('valid', True) else '  (验签结果为False)'
+        print(f"{r['implementation']:<16}{r['operation']:<8}{r['ops_per_sec']:>10.1f}{r['p50_ms']:>10.3f}"
+              f"{r['p99_ms']:>10.3f}{c.get('field_mul', 0):>10.0f}{c.get('inversions', 0):>8.1f}"
+              f"{c.get('point_ops', 0):>8.0f}{note}", file=file)
+
+
+def benchmark(rounds=20):
+    report = run(list(IMPLEMENTATIONS), rounds)
+    print_table(report, sys.stdout)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SM2各实现的keygen/sign/verify对比基准")
+    parser.add_argument('--rounds', type=int, default=50, help="每项操作的计时次数")
+    parser.add_argument('--count-rounds', type=int, default=5, help="每项操作的插桩计数次数")
+    parser.add_argument('--only', default=','.join(IMPLEMENTATIONS), help="逗号分隔的实现名")
+    parser.add_argument('--output', help="JSON结果文件（默认输出到stdout）")
+    parser.add_argument('--profile', help="cProfile统计文件（可用pstats或snakeviz查看）")
+    parser.add_argument('--count-only', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    names = [name for name in args.only.split(',') if name]
+    unknown = [name for name in names if name not in IMPLEMENTATIONS]
+    if unknown:
+        parser.error(f"未知实现: {', '.join(unknown)}（可选: {', '.join(IMPLEMENTATIONS)}）")
+
+    if args.count_only:
+        json.dump(count_all(names, args.count_rounds), sys.stdout)
+        return
+
+    profile = cProfile.Profile() if args.profile else None
+    report = run(names, args.rounds, args.count_rounds, profile)
+    print_table(report)
+
+    if profile is not None:
+        profile.dump_stats(args.profile)
+        print(f"\ncProfile已写入 {args.profile}，按自身耗时排序的前15项:", file=sys.stderr)
+        pstats.Stats(profile, stream=sys.stderr).sort_stats('tottime').print_stats(15)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
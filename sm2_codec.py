@@ -0,0 +1,99 @@
+import time
+
+from sm2_field import p, a, b
+from sm2_curve import is_on_curve, generate_key_pairs
+
+# SEC1点编码：压缩 02/03 || x（33字节），非压缩 04 || x || y（65字节），无穷远点 00
+COMPRESSED_SIZE = 33
+UNCOMPRESSED_SIZE = 65
+_SQRT_EXP = (p + 1) // 4  # p ≡ 3 (mod 4)，平方根为 y = c^((p+1)/4)
+
+
+def encode_point(point, compressed=True):
+    if point is None:
+        return b'\x00'
+    x, y = point
+    if compressed:
+        return bytes([2 | (y & 1)]) + x.to_bytes(32, 'big')
+    return b'\x04' + x.to_bytes(32, 'big') + y.to_bytes(32, 'big')
+
+
+def decompress(x, y_bit):
+    """由x和y的奇偶位恢复y，x不对应曲线点时抛出ValueError"""
+    if not 0 <= x < p:
+        raise ValueError("x坐标超出范围")
+    y_sq = (x * x * x + a * x + b) % p
+    y = pow(y_sq, _SQRT_EXP, p)
+    if (y * y) % p != y_sq:
+        raise ValueError("x坐标不对应曲线上的点")
+    if (y & 1) != y_bit:
+        y = p - y
+    return y
+
+
+def decode_point(data):
+    """解析SEC1编码的点（信任边界：结果一定在曲线上），无穷远点返回None"""
+    data = bytes(data)
+    if data == b'\x00':
+        return None
+    prefix = data[0] if data else None
+    if prefix in (2, 3) and len(data) == COMPRESSED_SIZE:
+        x = int.from_bytes(data[1:], 'big')
+        return (x, decompress(x, prefix & 1))
+    if prefix == 4 and len(data) == UNCOMPRESSED_SIZE:
+        point = (int.from_bytes(data[1:33], 'big'), int.from_bytes(data[33:], 'big'))
+        if not is_on_curve(point):
+            raise ValueError("点不在曲线上")
+        return point
+    raise ValueError("无效的点编码")
+
+
+def encode_points(points, compressed=True):
+    """把N个（有限）点打包成一段连续的定长缓冲区"""
+    size = COMPRESSED_SIZE if compressed else UNCOMPRESSED_SIZE
+    buffer = bytearray(size * len(points))
+    offset = 0
+    for x, y in points:
+        if compressed:
+            buffer[offset] = 2 | (y & 1)
+            buffer[offset + 1:offset + 33] = x.to_bytes(32, 'big')
+        else:
+            buffer[offset] = 4
+            buffer[offset + 1:offset + 33] = x.to_bytes(32, 'big')
+            buffer[offset + 33:offset + 65] = y.to_bytes(32, 'big')
+        offset += size
+    return bytes(buffer)
+
+
+def iter_decode_points(buffer, compressed=True):
+    """逐个解码encode_points产生的缓冲区（memoryview切片，不复制整段数据）"""
+    size = COMPRESSED_SIZE if compressed else UNCOMPRESSED_SIZE
+    view = memoryview(buffer)
+    if len(view) % size:
+        raise ValueError("缓冲区长度不是点编码长度的整数倍")
+    for offset in range(0, len(view), size):
+        yield decode_point(view[offset:offset + size])
+
+
+def decode_points(buffer, compressed=True):
+    return list(iter_decode_points(buffer, compressed))
+
+
+def benchmark():
+    count = 2000
+    points = [P for _, P in generate_key_pairs(count)]
+
+    for compressed in (True, False):
+        start = time.perf_counter()
+        buffer = encode_points(points, compressed)
+        encode_time = (time.perf_counter() - start) / count * 1e6
+        start = time.perf_counter()
+        decoded = decode_points(buffer, compressed)
+        decode_time = (time.perf_counter() - start) / count * 1e6
+        mode = "压缩" if compressed else "非压缩"
+        print(f"{mode}编码: {len(buffer) // count} 字节/点, 编码 {encode_time:.2f} µs/点, "
+              f"解码 {decode_time:.2f} µs/点, 结果一致: {decoded == points}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,254 @@
+import time
+
+from sm2_field import p, a, b, n, Gx, Gy, batch_inverse
+from sm3_drbg import randbelow, randbelow_many
+
+# 仿射点用(x, y)元组表示，无穷远点为None（与sm2.py一致）
+# Jacobian点用(X, Y, Z)表示，对应仿射点(X/Z², Y/Z³)，Z == 0为无穷远点
+G = (Gx, Gy)
+INF = (1, 1, 0)
+
+WINDOW = 4  # 窗口宽度（比特）
+KEYGEN_WINDOW = 8  # 批量密钥生成用更宽的固定基表：32次混合加法/个，表约1.5 MB
+KEYGEN_CHUNK = 1024  # 批量密钥生成每块大小（每块一次批量求逆）
+_BASE_TABLES = {}  # 基点G的固定基预计算表，按窗口宽度缓存，首次使用时构建
+
+
+def is_on_curve(point):
+    """验证仿射点是否在曲线上（y² ≡ x³ + ax + b mod p）"""
+    if point is None:
+        return False
+    x, y = point
+    if not (0 <= x < p and 0 <= y < p):
+        return False
+    return (y * y - (x * x * x + a * x + b)) % p == 0
+
+
+def to_jacobian(point):
+    """仿射点转Jacobian坐标"""
+    if point is None:
+        return INF
+    return (point[0], point[1], 1)
+
+
+def jacobian_double(P):
+    """Jacobian倍点（a = -3 专用公式）"""
+    X1, Y1, Z1 = P
+    if Z1 == 0 or Y1 == 0:
+        return INF
+    delta = (Z1 * Z1) % p
+    gamma = (Y1 * Y1) % p
+    beta = (X1 * gamma) % p
+    alpha = (3 * (X1 - delta) * (X1 + delta)) % p
+    X3 = (alpha * alpha - 8 * beta) % p
+    Z3 = ((Y1 + Z1) * (Y1 + Z1) - gamma - delta) % p
+    Y3 = (alpha * (4 * beta - X3) - 8 * gamma * gamma) % p
+    return (X3, Y3, Z3)
+
+
+def jacobian_add(P, Q):
+    """Jacobian点加"""
+    X1, Y1, Z1 = P
+    X2, Y2, Z2 = Q
+    if Z1 == 0:
+        return Q
+    if Z2 == 0:
+        return P
+
+    Z1Z1 = (Z1 * Z1) % p
+    Z2Z2 = (Z2 * Z2) % p
+    U1 = (X1 * Z2Z2) % p
+    U2 = (X2 * Z1Z1) % p
+    S1 = (Y1 * Z2 * Z2Z2) % p
+    S2 = (Y2 * Z1 * Z1Z1) % p
+    H = (U2 - U1) % p
+    R = (S2 - S1) % p
+    if H == 0:
+        return jacobian_double(P) if R == 0 else INF
+
+    H2 = (H * H) % p
+    H3 = (H * H2) % p
+    U1H2 = (U1 * H2) % p
+    X3 = (R * R - H3 - 2 * U1H2) % p
+    Y3 = (R * (U1H2 - X3) - S1 * H3) % p
+    Z3 = (H * Z1 * Z2) % p
+    return (X3, Y3, Z3)
+
+
+def jacobian_add_affine(P, q):
+    """Jacobian点与仿射点的混合加法（q的Z = 1，省去若干乘法）"""
+    if q is None:
+        return P
+    X1, Y1, Z1 = P
+    if Z1 == 0:
+        return (q[0], q[1], 1)
+
+    Z1Z1 = (Z1 * Z1) % p
+    U2 = (q[0] * Z1Z1) % p
+    S2 = (q[1] * Z1 * Z1Z1) % p
+    H = (U2 - X1) % p
+    R = (S2 - Y1) % p
+    if H == 0:
+        return jacobian_double(P) if R == 0 else INF
+
+    H2 = (H * H) % p
+    H3 = (H * H2) % p
+    U1H2 = (X1 * H2) % p
+    X3 = (R * R - H3 - 2 * U1H2) % p
+    Y3 = (R * (U1H2 - X3) - Y1 * H3) % p
+    Z3 = (Z1 * H) % p
+    return (X3, Y3, Z3)
+
+
+def to_affine(P):
+    """Jacobian点转仿射坐标"""
+    return batch_to_affine([P])[0]
+
+
+def batch_to_affine(points):
+    """批量Jacobian转仿射：所有Z共用一次模逆"""
+    points = list(points)
+    finite = [i for i, P in enumerate(points) if P[2] % p != 0]
+    z_invs = batch_inverse([points[i][2] for i in finite])
+
+    result = [None] * len(points)
+    for i, z_inv in zip(finite, z_invs):
+        X, Y, _ = points[i]
+        z_inv2 = (z_inv * z_inv) % p
+        result[i] = ((X * z_inv2) % p, (Y * z_inv2 * z_inv) % p)
+    return result
+
+
+def window_table(point, w=WINDOW):
+    """可变基预计算表：[None, P, 2P, ..., (2^w - 1)P]（仿射坐标）"""
+    return window_tables([point], w)[0]
+
+
+def window_tables(points, w=WINDOW):
+    """批量构建多个点的预计算表，所有倍数点共用一次模逆"""
+    size = (1 << w) - 1
+    multiples = []
+    for point in points:
+        current = to_jacobian(point)
+        multiples.append(current)
+        for _ in range(1, size):
+            current = jacobian_add_affine(current, point)
+            multiples.append(current)
+    affine = batch_to_affine(multiples)
+    return [[None] + affine[i * size:(i + 1) * size] for i in range(len(points))]
+
+
+def mul_table(k, table, w=WINDOW):
+    """定窗口标量乘法，返回Jacobian点"""
+    k %= n
+    mask = (1 << w) - 1
+    result = INF
+    for shift in range(((k.bit_length() + w - 1) // w - 1) * w, -1, -w):
+        for _ in range(w):
+            result = jacobian_double(result)
+        digit = (k >> shift) & mask
+        if digit:
+            result = jacobian_add_affine(result, table[digit])
+    return result
+
+
+def scalar_mult(k, point):
+    """可变基标量乘法（仿射输入/输出）"""
+    if point is None:
+        return None
+    return to_affine(mul_table(k, window_table(point)))
+
+
+def comb_table(point, w=WINDOW):
+    """梳状预计算表：rows[i][j] = j·2^(w·i)·P（仿射坐标），乘法时无需倍点"""
+    width = 1 << w
+    row_count = (n.bit_length() + w - 1) // w
+    flat = []
+    row_base = to_jacobian(point)
+    for _ in range(row_count):
+        current = row_base
+        flat.append(current)
+        for _ in range(2, width):
+            current = jacobian_add(current, row_base)
+            flat.append(current)
+        row_base = jacobian_add(current, row_base)  # 2^w·row_base
+
+    affine = batch_to_affine(flat)
+    return [[None] + affine[i * (width - 1):(i + 1) * (width - 1)] for i in range(row_count)]
+
+
+def mul_comb(k, rows, w=WINDOW):
+    """用梳状表计算k·P（只有混合加法），返回Jacobian点"""
+    k %= n
+    mask = (1 << w) - 1
+    result = INF
+    for row in rows:
+        digit = k & mask
+        if digit:
+            result = jacobian_add_affine(result, row[digit])
+        k >>= w
+        if k == 0:
+            break
+    return result
+
+
+def base_table(w=WINDOW):
+    """基点G的固定基预计算表（首次使用时构建）"""
+    rows = _BASE_TABLES.get(w)
+    if rows is None:
+        rows = _BASE_TABLES[w] = comb_table(G, w)
+    return rows
+
+
+def mul_base(k, w=WINDOW):
+    """固定基标量乘法k·G，返回Jacobian点"""
+    return mul_comb(k, base_table(w), w)
+
+
+def scalar_mult_base(k):
+    """k·G（仿射输出）"""
+    return to_affine(mul_base(k))
+
+
+def generate_key_pairs(count, chunk_size=KEYGEN_CHUNK, w=KEYGEN_WINDOW):
+    """批量生成count个密钥对(d, P)的生成器
+
+    每块chunk_size个公钥用宽窗口固定基表计算并保持Jacobian坐标，再一次批量转仿射，
+    内存占用只与chunk_size有关。d取[1, n-2]，保证(1+d)可逆。
+    """
+    while count > 0:
+        size = min(count, chunk_size)
+        private_keys = [d + 1 for d in randbelow_many(n - 2, size)]
+        public_keys = batch_to_affine([mul_base(d, w) for d in private_keys])
+        yield from zip(private_keys, public_keys)
+        count -= size
+
+
+def benchmark():
+    rounds = 200
+    k = randbelow(n)
+    base_table()  # 预先构建固定基表，不计入计时
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        scalar_mult_base(k)
+    base_time = (time.perf_counter() - start) / rounds * 1000
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        scalar_mult(k, G)
+    var_time = (time.perf_counter() - start) / rounds * 1000
+
+    base_table(KEYGEN_WINDOW)
+    start = time.perf_counter()
+    for _ in generate_key_pairs(rounds):
+        pass
+    keygen_time = (time.perf_counter() - start) / rounds * 1000
+
+    print(f"固定基标量乘法平均耗时: {base_time:.3f} ms")
+    print(f"可变基标量乘法平均耗时: {var_time:.3f} ms")
+    print(f"批量密钥生成平均耗时: {keygen_time:.3f} ms/个")
+
+
+if __name__ == "__main__":
+    benchmark()
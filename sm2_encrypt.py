@@ -0,0 +1,116 @@
+import hmac
+import os
+import time
+
+from sm2_field import n
+from sm2_curve import mul_base, mul_table, window_table, batch_to_affine, to_affine, generate_key_pairs
+from sm2_codec import COMPRESSED_SIZE, UNCOMPRESSED_SIZE, encode_point, decode_point
+from sm3_backend import sm3_new
+from sm3_drbg import randbelow
+
+CHUNK_SIZE = 64 * 1024  # 明文按块异或，每块只生成对应长度的密钥流
+C3_SIZE = 32
+
+
+def kdf_stream(Z):
+    """SM3 KDF密钥流：依次产生 H(Z || ct)，ct从1开始
+
+    Z的完整分组只压缩一次（x2||y2恰为64字节），之后每个输出块只需压缩末尾分组。
+    """
+    prefix = sm3_new(Z)
+    ct = 1
+    while True:
+        h = prefix.copy()
+        h.update(ct.to_bytes(4, 'big'))
+        yield h.digest()
+        ct += 1
+
+
+def kdf(Z, klen):
+    stream = kdf_stream(Z)
+    return b''.join(next(stream) for _ in range((klen + 31) // 32))[:klen]
+
+
+def _xor_chunks(message, stream, chunk_size):
+    """逐块用密钥流异或，返回(结果, 密钥流是否全零)"""
+    view = memoryview(message)
+    output = bytearray()
+    all_zero = True
+    for offset in range(0, len(view), chunk_size):
+        chunk = view[offset:offset + chunk_size]
+        keystream = b''.join(next(stream) for _ in range((len(chunk) + 31) // 32))[:len(chunk)]
+        if all_zero and any(keystream):
+            all_zero = False
+        output += (int.from_bytes(chunk, 'big') ^ int.from_bytes(keystream, 'big')).to_bytes(len(chunk), 'big')
+    return output, all_zero
+
+
+def encrypt(PB, message, compressed=False, chunk_size=CHUNK_SIZE):
+    """SM2公钥加密，输出 C1 || C3 || C2"""
+    if isinstance(message, str):
+        message = message.encode('utf-8')
+    table = window_table(PB)
+
+    while True:
+        k = randbelow(n - 1) + 1
+        # C1 = k·G（固定基）与 k·PB（可变基）共用一次批量求逆
+        C1, shared = batch_to_affine([mul_base(k), mul_table(k, table)])
+        if shared is None:
+            raise ValueError("公钥无效")
+        x2 = shared[0].to_bytes(32, 'big')
+        y2 = shared[1].to_bytes(32, 'big')
+
+        C2, all_zero = _xor_chunks(message, kdf_stream(x2 + y2), chunk_size)
+        if all_zero and message:
+            continue
+
+        h = sm3_new(x2)
+        for offset in range(0, len(message), chunk_size):
+            h.update(message[offset:offset + chunk_size])
+        h.update(y2)
+        return encode_point(C1, compressed) + h.digest() + bytes(C2)
+
+
+def decrypt(dB, ciphertext, chunk_size=CHUNK_SIZE):
+    """SM2私钥解密，C3校验失败时抛出ValueError"""
+    c1_size = COMPRESSED_SIZE if ciphertext[:1] in (b'\x02', b'\x03') else UNCOMPRESSED_SIZE
+    if len(ciphertext) < c1_size + C3_SIZE:
+        raise ValueError("密文长度不足")
+    C1 = decode_point(ciphertext[:c1_size])
+    if C1 is None:
+        raise ValueError("C1为无穷远点")
+    C3 = ciphertext[c1_size:c1_size + C3_SIZE]
+    C2 = memoryview(ciphertext)[c1_size + C3_SIZE:]
+
+    shared = to_affine(mul_table(dB, window_table(C1)))
+    if shared is None:
+        raise ValueError("解密失败")
+    x2 = shared[0].to_bytes(32, 'big')
+    y2 = shared[1].to_bytes(32, 'big')
+
+    message, all_zero = _xor_chunks(C2, kdf_stream(x2 + y2), chunk_size)
+    h = sm3_new(x2)
+    for offset in range(0, len(message), chunk_size):
+        h.update(message[offset:offset + chunk_size])
+    h.update(y2)
+    if (all_zero and message) or not hmac.compare_digest(h.digest(), C3):
+        raise ValueError("解密失败：C3校验不通过")
+    return bytes(message)
+
+
+def benchmark():
+    (dB, PB), = generate_key_pairs(1)
+    for size in (32, 4096, 64 * 1024, 1024 * 1024):
+        message = os.urandom(size)
+        start = time.perf_counter()
+        ciphertext = encrypt(PB, message)
+        encrypt_time = time.perf_counter() - start
+        start = time.perf_counter()
+        plaintext = decrypt(dB, ciphertext)
+        decrypt_time = time.perf_counter() - start
+        print(f"{size} 字节: 加密 {encrypt_time * 1000:.1f} ms, 解密 {decrypt_time * 1000:.1f} ms, "
+              f"密文扩展 {len(ciphertext) - size} 字节, 结果: {'成功' if plaintext == message else '失败'}")
+
+
+if __name__ == "__main__":
+    benchmark()
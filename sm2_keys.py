@@ -0,0 +1,310 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from sm2_field import n, inverse
+from sm2_curve import (is_on_curve, jacobian_add, mul_base, mul_comb, comb_table, to_affine, batch_to_affine,
+                       scalar_mult_base, generate_key_pairs)
+from precompute_pool import PrecomputePool
+from sm2_sign import to_bytes, compute_ZA, compute_e, sign
+from sm3_drbg import randbelow_many
+
+
+def _table_bytes(rows):
+    """估算预计算表占用的内存（字节）"""
+    total = sys.getsizeof(rows)
+    for row in rows:
+        total += sys.getsizeof(row)
+        for point in row:
+            if point is not None:
+                total += sys.getsizeof(point) + sys.getsizeof(point[0]) + sys.getsizeof(point[1])
+    return total
+
+
+class VerifyingKey:
+    """验签公钥：缓存ZA和公钥PA的梳状预计算表，重复验签时免去ZA哈希和PA的倍点"""
+    __slots__ = ['ID', 'PA', 'ZA', 'table', 'nbytes']
+
+    def __init__(self, PA, ID):
+        if not is_on_curve(PA):
+            raise ValueError("公钥不在曲线上")
+        self.ID = to_bytes(ID)
+        self.PA = PA
+        self.ZA = compute_ZA(self.ID, PA)
+        self.table = comb_table(PA)
+        self.nbytes = _table_bytes(self.table)
+
+    def verify(self, message, signature):
+        r, s = signature
+        if not (1 <= r < n and 1 <= s < n):
+            return False
+        t = (r + s) % n
+        if t == 0:
+            return False
+
+        e = compute_e(self.ZA, message)
+        x1y1 = to_affine(jacobian_add(mul_base(s), mul_comb(t, self.table)))
+        if x1y1 is None:
+            return False
+        return (e + x1y1[0]) % n == r
+
+    def __repr__(self):
+        return f"VerifyingKey(ID={self.ID!r}, PA=(0x{self.PA[0]:x}, 0x{self.PA[1]:x}))"
+
+
+class VerifyingKeyCache:
+    """按(ID, PA)缓存VerifyingKey的LRU，同时限制条目数和预计算表总内存"""
+
+    def __init__(self, max_entries=4096, max_bytes=512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, PA, ID):
+        key = (to_bytes(ID), PA)
+        with self._lock:
+            vk = self._entries.get(key)
+            if vk is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vk
+            self.misses += 1
+
+        vk = VerifyingKey(PA, ID)  # 预计算在锁外进行，避免阻塞其他线程
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = vk
+                self.nbytes += vk.nbytes
+                self._evict()
+            return self._entries.get(key, vk)
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self.nbytes > self.max_bytes):
+            _, old = self._entries.popitem(last=False)
+            self.nbytes -= old.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.nbytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+# 进程级缓存
+verifying_keys = VerifyingKeyCache()
+
+
+def get_verifying_key(PA, ID):
+    return verifying_keys.get(PA, ID)
+
+
+def verify(PA, ID, message, signature):
+    """与sm2_sign.verify接口一致，走进程级VerifyingKey缓存"""
+    try:
+        vk = get_verifying_key(PA, ID)
+    except ValueError:
+        return False
+    return vk.verify(message, signature)
+
+
+class NoncePool(PrecomputePool):
+    """离线预计算的(k, kG的x坐标)池，后台线程在深度低于low_water时批量补充
+
+    补充时整批点共用一次批量求逆；池空时sign退化为在线计算，并计入misses。
+    fork后子进程中的池被清空，见precompute_pool。
+    """
+    thread_name = "sm2-nonce-pool"
+
+    @staticmethod
+    def generate(count):
+        """生成count个(k, x1)，Jacobian结果批量转仿射"""
+        ks = [k + 1 for k in randbelow_many(n - 1, count)]
+        points = batch_to_affine([mul_base(k) for k in ks])
+        return [(k, P[0]) for k, P in zip(ks, points)]
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    """fork后的子进程：丢弃进程级默认池（池本身由precompute_pool清空）"""
+    global _default_pool, _default_pool_lock
+    _default_pool = None
+    _default_pool_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def default_nonce_pool():
+    """进程级共享nonce池（k与私钥无关，可被所有SigningKey共用）"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = NoncePool()
+        return _default_pool
+
+
+class SigningKey:
+    """签名私钥：预计算(1+d)⁻¹和ZA，k与kG取自NoncePool，在线签名只剩一次哈希和少量模乘"""
+
+    def __init__(self, d, ID, PA=None, pool=None):
+        if not 1 <= d < n - 1:
+            raise ValueError("私钥必须满足 1 <= d < n - 1")
+        self.d = d
+        self.ID = to_bytes(ID)
+        self.PA = PA if PA is not None else scalar_mult_base(d)
+        self.ZA = compute_ZA(self.ID, self.PA)
+        self.inv_1d = inverse(1 + d, n)
+        self.pool = pool if pool is not None else default_nonce_pool()
+
+    def sign(self, message):
+        e = compute_e(self.ZA, message)
+        while True:
+            k, x1 = self.pool.take()
+            r = (e + x1) % n
+            if r == 0 or (r + k) % n == 0:
+                continue
+            # s = (1+d)⁻¹·(k - r·d) = (1+d)⁻¹·(k + r) - r
+            s = (self.inv_1d * (k + r) - r) % n
+            if s != 0:
+                return (r, s)
+
+    def verifying_key(self):
+        return get_verifying_key(self.PA, self.ID)
+
+    def __repr__(self):
+        return f"SigningKey(ID={self.ID!r}, PA=(0x{self.PA[0]:x}, 0x{self.PA[1]:x}))"
+
+
+# 密钥文件：4字节魔数 + 1字节版本，之后每条记录为 d || x || y（各32字节大端）
+KEY_FILE_MAGIC = b'SM2K'
+KEY_FILE_VERSION = 1
+KEY_RECORD_SIZE = 96
+
+
+def write_key_file(path, count, chunk_size=1024):
+    """流式生成count个密钥对并写入二进制密钥文件，内存只与chunk_size有关
+
+    私钥文件权限为0600：先写入同目录下的临时文件，fsync后再原子替换为path，中断时不留下不完整的密钥文件。
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(KEY_FILE_MAGIC + bytes([KEY_FILE_VERSION]))
+            buffer = bytearray()
+            for d, (x, y) in generate_key_pairs(count, chunk_size):
+                buffer += d.to_bytes(32, 'big') + x.to_bytes(32, 'big') + y.to_bytes(32, 'big')
+                if len(buffer) >= chunk_size * KEY_RECORD_SIZE:
+                    f.write(buffer)
+                    buffer.clear()
+            f.write(buffer)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+
+def read_key_file(path, chunk_size=1024):
+    """逐条读取密钥文件，产生(d, (x, y))"""
+    with open(path, 'rb') as f:
+        header = f.read(len(KEY_FILE_MAGIC) + 1)
+        if len(header) != len(KEY_FILE_MAGIC) + 1 or header[:4] != KEY_FILE_MAGIC or header[4] != KEY_FILE_VERSION:
+            raise ValueError("不是有效的SM2密钥文件")
+        while True:
+            block = f.read(chunk_size * KEY_RECORD_SIZE)
+            if not block:
+                return
+            if len(block) % KEY_RECORD_SIZE:
+                raise ValueError("密钥文件被截断")
+            view = memoryview(block)
+            for i in range(0, len(block), KEY_RECORD_SIZE):
+                yield (int.from_bytes(view[i:i + 32], 'big'),
+                       (int.from_bytes(view[i + 32:i + 64], 'big'), int.from_bytes(view[i + 64:i + 96], 'big')))
+
+
+def benchmark_sign():
+    rounds = 200
+    ID = "ALICE123@YAHOO.COM"
+    message = "Hello SM2 - 签名私钥测试"
+    (d, PA), = generate_key_pairs(1)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        sign(d, PA, ID, message)
+    plain_time = (time.perf_counter() - start) / rounds * 1000
+
+    pool = NoncePool(capacity=rounds, low_water=rounds // 4, background=False)
+    pool.fill()
+    sk = SigningKey(d, ID, PA, pool=pool)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        signature = sk.sign(message)
+    pooled_time = (time.perf_counter() - start) / rounds * 1000
+
+    stats = pool.stats()
+    print(f"直接签名平均耗时: {plain_time:.3f} ms")
+    print(f"SigningKey在线签名平均耗时: {pooled_time:.3f} ms")
+    print(f"nonce池补充速率: {stats['refill_rate']:.1f} 个/秒, 池深度: {stats['depth']}, "
+          f"未命中: {stats['misses']}")
+    print(f"验证结果: {'成功' if sk.verifying_key().verify(message, signature) else '失败'}\n")
+
+
+def benchmark():
+    import sm2_sign
+
+    rounds = 200
+    key_count = 10
+    ID = "ALICE123@YAHOO.COM"
+    message = "Hello SM2 - 公钥缓存测试"
+    keys = generate_key_pairs(key_count)
+    items = [(PA, sign(d, PA, ID, message)) for d, PA in keys]
+
+    start = time.perf_counter()
+    for i in range(rounds):
+        PA, signature = items[i % key_count]
+        sm2_sign.verify(PA, ID, message, signature)
+    plain_time = (time.perf_counter() - start) / rounds * 1000
+
+    start = time.perf_counter()
+    for i in range(rounds):
+        PA, signature = items[i % key_count]
+        verify(PA, ID, message, signature)
+    cached_time = (time.perf_counter() - start) / rounds * 1000
+
+    stats = verifying_keys.stats()
+    print(f"无缓存验证平均耗时: {plain_time:.3f} ms")
+    print(f"缓存验证平均耗时: {cached_time:.3f} ms（含{key_count}次预计算）")
+    print(f"缓存命中率: {stats['hit_rate']:.2%}, 条目数: {stats['entries']}, "
+          f"内存: {stats['bytes'] / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    benchmark_sign()
+    benchmark()
@@ -0,0 +1,178 @@
+import time
+
+from bigint_backend import legendre
+from sm2_field import p, a, b, n, inverse
+from sm2_curve import scalar_mult, generate_key_pairs
+
+# 共Z（co-Z）Montgomery阶梯：R0、R1始终共用同一个Z，只存(X, Y)
+# 公式见 Goundar、Joye、Miyaji《Co-Z Addition Formulæ and Binary Ladders on Elliptic Curves》
+# x-only阶梯只存(X, Z)，差分加法利用R1 - R0 = P，公式见 Brier、Joye《Weierstrass Elliptic Curves and Side-Channel Attacks》
+_B4 = (4 * b) % p
+_B8 = (8 * b) % p
+
+
+def xycz_idbl(x, y):
+    """初始倍点：由仿射点P返回共Z的(2P, P)和公共Z"""
+    y2 = (y * y) % p
+    M = (3 * x * x + a) % p
+    S = (4 * x * y2) % p
+    X2 = (M * M - 2 * S) % p
+    Y2 = (M * (S - X2) - 8 * y2 * y2) % p
+    return (X2, Y2), (S, (8 * y2 * y2) % p), (2 * y) % p
+
+
+def xycz_add(P1, P2):
+    """共Z加法：返回(P1 + P2, 与之共Z的P1, Z的乘数)"""
+    X1, Y1 = P1
+    X2, Y2 = P2
+    dX = (X2 - X1) % p
+    A = (dX * dX) % p
+    B = (X1 * A) % p
+    C = (X2 * A) % p
+    dY = Y2 - Y1
+    E = (Y1 * (C - B)) % p
+    X3 = (dY * dY - B - C) % p
+    Y3 = (dY * (B - X3) - E) % p
+    return (X3, Y3), (B, E), dX
+
+
+def xycz_addc(P1, P2):
+    """共Z共轭加法：返回(P1 + P2, P1 - P2, Z的乘数)"""
+    X1, Y1 = P1
+    X2, Y2 = P2
+    dX = (X2 - X1) % p
+    A = (dX * dX) % p
+    B = (X1 * A) % p
+    C = (X2 * A) % p
+    dY = Y2 - Y1
+    sY = Y2 + Y1
+    E = (Y1 * (C - B)) % p
+    X3 = (dY * dY - B - C) % p
+    Y3 = (dY * (B - X3) - E) % p
+    X4 = (sY * sY - B - C) % p
+    Y4 = (sY * (X4 - B) - E) % p
+    return (X3, Y3), (X4, Y4), dX
+
+
+def ladder(k, point):
+    """共Z Montgomery阶梯计算k·P，只返回结果的仿射x坐标
+
+    每一位固定执行一次ADDC和一次ADD；公共Z只累乘不求逆，最后一次模逆得到x。
+    出现退化情况（R0 = ±R1）时退回通用标量乘法。
+    """
+    k %= n
+    if k == 0:
+        raise ValueError("k·P为无穷远点")
+    if k == 1:
+        return point[0]
+
+    R1, R0, Z = xycz_idbl(*point)
+    R = [R0, R1]
+    for i in range(k.bit_length() - 2, -1, -1):
+        bit = (k >> i) & 1
+        R[1 - bit], R[bit], dZ = xycz_addc(R[bit], R[1 - bit])
+        Z = (Z * dZ) % p
+        R[bit], R[1 - bit], dZ = xycz_add(R[1 - bit], R[bit])
+        Z = (Z * dZ) % p
+    if Z == 0:
+        result = scalar_mult(k, point)
+        if result is None:
+            raise ValueError("k·P为无穷远点")
+        return result[0]
+    z_inv = inverse(Z)
+    return (R[0][0] * z_inv * z_inv) % p
+
+
+def ladder_x(k, x):
+    """x-only Montgomery阶梯：输入点的x坐标，返回k·P的x坐标
+
+    R0、R1以(X, Z)表示，每一位一次差分加法和一次倍点，全程不恢复y；
+    x不对应曲线点时抛出ValueError（只算Legendre符号，不开平方）。
+    """
+    if not 0 <= x < p or legendre(x * x * x + a * x + b, p) < 0:
+        raise ValueError("x坐标不对应曲线上的点")
+    k %= n
+    if k == 0:
+        raise ValueError("k·P为无穷远点")
+
+    # R0 = P, R1 = 2P
+    X1, Z1 = x, 1
+    xx = (x * x) % p
+    X2 = ((xx - a) ** 2 - _B8 * x) % p
+    Z2 = (4 * (xx * x + a * x + b)) % p
+    for i in range(k.bit_length() - 2, -1, -1):
+        bit = (k >> i) & 1
+        if bit:
+            X1, Z1, X2, Z2 = X2, Z2, X1, Z1
+        # (X2, Z2) <- R0 + R1（差为P，仿射x已知）
+        A = X1 * Z2
+        B = X2 * Z1
+        C = ((A - B) ** 2) % p
+        ZZ = (Z1 * Z2) % p
+        X2 = (2 * (A + B) * (X1 * X2 + a * ZZ) + _B4 * ZZ * ZZ - x * C) % p
+        Z2 = C
+        # (X1, Z1) <- 2·R0
+        XX = (X1 * X1) % p
+        ZZ = (Z1 * Z1) % p
+        ZZZ = Z1 * ZZ
+        X1, Z1 = ((XX - a * ZZ) ** 2 - _B8 * X1 * ZZZ) % p, (4 * Z1 * (X1 * (XX + a * ZZ) + b * ZZZ)) % p
+        if bit:
+            X1, Z1, X2, Z2 = X2, Z2, X1, Z1
+    if Z1 == 0:
+        raise ValueError("k·P为无穷远点")
+    return (X1 * inverse(Z1)) % p
+
+
+def encode_x(x):
+    """x坐标编码为32字节（GPC传输与比较用）"""
+    return int(x).to_bytes(32, 'big')
+
+
+def decode_x(data):
+    if len(data) != 32:
+        raise ValueError("x坐标编码必须为32字节")
+    return int.from_bytes(data, 'big')
+
+
+def benchmark():
+    import GPC
+    from sm2_codec import decompress
+
+    rounds = 100
+    points = [P for _, P in generate_key_pairs(rounds)]
+    k = int.from_bytes(bytes(range(32)), 'big') % n
+
+    start = time.perf_counter()
+    ladder_results = [ladder(k, P) for P in points]
+    ladder_time = (time.perf_counter() - start) / rounds * 1000
+
+    start = time.perf_counter()
+    ladder_x_results = [ladder_x(k, P[0]) for P in points]
+    ladder_x_time = (time.perf_counter() - start) / rounds * 1000
+
+    start = time.perf_counter()
+    window_results = [scalar_mult(k, P)[0] for P in points]
+    window_time = (time.perf_counter() - start) / rounds * 1000
+
+    # 只有x时定窗口须先开平方恢复y
+    start = time.perf_counter()
+    for P in points:
+        scalar_mult(k, (P[0], decompress(P[0], 0)))
+    window_x_time = (time.perf_counter() - start) / rounds * 1000
+
+    gpc_rounds = 10
+    start = time.perf_counter()
+    for P in points[:gpc_rounds]:
+        GPC.scalar_mult(k, GPC.Point(*P))
+    gpc_time = (time.perf_counter() - start) / gpc_rounds * 1000
+
+    print(f"共Z阶梯(已知y): {ladder_time:.3f} ms/次")
+    print(f"XZ阶梯(x-only，不恢复y): {ladder_x_time:.3f} ms/次")
+    print(f"Jacobian定窗口: {window_time:.3f} ms/次（只有x时含开平方 {window_x_time:.3f} ms/次）")
+    print(f"GPC.scalar_mult(仿射): {gpc_time:.3f} ms/次")
+    print(f"结果一致: {ladder_results == window_results == ladder_x_results}")
+    print(f"每个元素传输: 32 字节（原(x, y)元组约 {2 * 32} 字节原始数据）")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,122 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sm2_curve import base_table, generate_key_pairs
+from sm2_keys import NoncePool, SigningKey, get_verifying_key, verify
+
+# 工作进程内的密钥（由initializer在进程启动时构建一次，请求只携带密钥名）
+_signing_keys = {}
+
+
+def _init_worker(signing_keys, verifying_keys):
+    base_table()
+    pool = NoncePool()  # 每个工作进程各自的nonce池，不与父进程或其他工作进程共享任何k
+    for name, (d, ID) in signing_keys.items():
+        _signing_keys[name] = SigningKey(d, ID, pool=pool)
+    for PA, ID in verifying_keys:
+        get_verifying_key(PA, ID)
+
+
+def _sign_chunk(name, messages):
+    sk = _signing_keys[name]
+    return [sk.sign(message) for message in messages]
+
+
+def _verify_chunk(items):
+    return [verify(PA, ID, message, signature) for PA, ID, message, signature in items]
+
+
+def _chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class SM2Service:
+    """多进程SM2签名/验签服务
+
+    signing_keys: {名称: (d, ID)}，verifying_keys: [(PA, ID), ...]。
+    密钥和预计算表在每个工作进程启动时加载一次；请求按chunk_size分块发送。
+    工作进程用spawn启动，不继承父进程的nonce池等状态。
+    """
+
+    def __init__(self, workers=None, signing_keys=None, verifying_keys=(), chunk_size=64):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(dict(signing_keys or {}), list(verifying_keys)),
+        )
+
+    def submit_sign(self, name, messages):
+        """提交一个分块，返回Future"""
+        return self._executor.submit(_sign_chunk, name, messages)
+
+    def submit_verify(self, items):
+        return self._executor.submit(_verify_chunk, items)
+
+    def sign_many(self, name, messages):
+        futures = [self.submit_sign(name, chunk) for chunk in _chunks(list(messages), self.chunk_size)]
+        return [signature for future in futures for signature in future.result()]
+
+    def verify_many(self, items):
+        """items: [(PA, ID, message, signature), ...]"""
+        futures = [self.submit_verify(chunk) for chunk in _chunks(list(items), self.chunk_size)]
+        return [valid for future in futures for valid in future.result()]
+
+    def warm_up(self):
+        """确保所有工作进程已启动并完成initializer"""
+        list(self._executor.map(_verify_chunk, [[] for _ in range(self.workers)]))
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def _run_timed(submit, chunks):
+    """提交所有分块，返回(总耗时, 每块延迟列表)"""
+    latencies = []
+    start = time.perf_counter()
+    futures = []
+    for chunk in chunks:
+        submitted = time.perf_counter()
+        future = submit(chunk)
+        future.add_done_callback(lambda _, t=submitted: latencies.append(time.perf_counter() - t))
+        futures.append(future)
+    for future in futures:
+        future.result()
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def benchmark(max_workers=None, total=2000, chunk_size=64):
+    max_workers = max_workers or os.cpu_count() or 1
+    ID = "ALICE123@YAHOO.COM"
+    (d, PA), = generate_key_pairs(1)
+    messages = [f"message {i}" for i in range(total)]
+
+    print(f"{'进程数':>6} {'签名/秒':>10} {'验签/秒':>10} {'验签块延迟p50(ms)':>16} {'验签块延迟p99(ms)':>16}")
+    for workers in range(1, max_workers + 1):
+        with SM2Service(workers, {'alice': (d, ID)}, [(PA, ID)], chunk_size) as service:
+            service.warm_up()
+            sign_time, _ = _run_timed(lambda c: service.submit_sign('alice', c), _chunks(messages, chunk_size))
+            signatures = service.sign_many('alice', messages)
+            items = [(PA, ID, m, s) for m, s in zip(messages, signatures)]
+            verify_time, latencies = _run_timed(service.submit_verify, _chunks(items, chunk_size))
+
+        print(f"{workers:>6} {total / sign_time:>10.1f} {total / verify_time:>10.1f} "
+              f"{_percentile(latencies, 0.5) * 1000:>16.2f} {_percentile(latencies, 0.99) * 1000:>16.2f}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,128 @@
+import time
+from gmssl import sm3
+
+from sm2_field import a, b, n, Gx, Gy, inverse
+from sm2_curve import (is_on_curve, jacobian_add, mul_base, mul_table, window_table, window_tables,
+                       to_affine, batch_to_affine, generate_key_pairs)
+from sm3_drbg import randbelow
+
+
+def int_to_32bytes(num):
+    """大整数转32字节（无符号大端）"""
+    return num.to_bytes(32, byteorder='big', signed=False)
+
+
+def sm3_hash(data):
+    return bytes.fromhex(sm3.sm3_hash([b for b in data]))
+
+
+def to_bytes(message):
+    if isinstance(message, str):
+        return message.encode('utf-8')
+    if isinstance(message, (bytes, bytearray)):
+        return bytes(message)
+    raise TypeError("消息必须是字符串或bytes类型")
+
+
+def compute_ZA(ID, PA):
+    """计算ZA = SM3(ENTLA || ID || a || b || Gx || Gy || xA || yA)"""
+    ID = to_bytes(ID)
+    za_data = (
+            (len(ID) * 8).to_bytes(2, 'big') +
+            ID +
+            int_to_32bytes(a) +
+            int_to_32bytes(b) +
+            int_to_32bytes(Gx) +
+            int_to_32bytes(Gy) +
+            int_to_32bytes(PA[0]) +
+            int_to_32bytes(PA[1])
+    )
+    return int.from_bytes(sm3_hash(za_data), 'big')
+
+
+def compute_e(ZA, message):
+    """e = SM3(ZA || M)"""
+    return int.from_bytes(sm3_hash(int_to_32bytes(ZA) + to_bytes(message)), 'big')
+
+
+def sign(d, PA, ID, message):
+    e = compute_e(compute_ZA(ID, PA), message)
+    inv_1d = inverse(1 + d, n)
+
+    while True:
+        k = randbelow(n - 1) + 1
+        x1, _ = to_affine(mul_base(k))
+        r = (e + x1) % n
+        if r == 0 or (r + k) % n == 0:
+            continue
+        s = (inv_1d * (k - r * d)) % n
+        if s != 0:
+            return (r, s)
+
+
+def _verify_scalars(PA, ID, message, signature):
+    """校验签名范围并计算(e, t)，无效时返回None"""
+    r, s = signature
+    if not (1 <= r < n and 1 <= s < n):
+        return None
+    if not is_on_curve(PA):
+        return None
+    t = (r + s) % n
+    if t == 0:
+        return None
+    return compute_e(compute_ZA(ID, PA), message), t
+
+
+def verify(PA, ID, message, signature):
+    scalars = _verify_scalars(PA, ID, message, signature)
+    if scalars is None:
+        return False
+    e, t = scalars
+    x1y1 = to_affine(jacobian_add(mul_base(signature[1]), mul_table(t, window_table(PA))))
+    if x1y1 is None:
+        return False
+    return (e + x1y1[0]) % n == signature[0]
+
+
+def batch_verify(items):
+    """批量验证[(PA, ID, message, signature), ...]
+
+    各公钥的预计算表和所有结果点的仿射转换分别只做一次批量模逆。
+    """
+    scalars = [_verify_scalars(*item) for item in items]
+    valid = [i for i, item in enumerate(scalars) if item is not None]
+    tables = window_tables([items[i][0] for i in valid])
+    points = batch_to_affine([
+        jacobian_add(mul_base(items[i][3][1]), mul_table(scalars[i][1], table))
+        for i, table in zip(valid, tables)
+    ])
+
+    results = [False] * len(items)
+    for i, x1y1 in zip(valid, points):
+        if x1y1 is not None:
+            results[i] = (scalars[i][0] + x1y1[0]) % n == items[i][3][0]
+    return results
+
+
+def benchmark():
+    rounds = 100
+    ID = "ALICE123@YAHOO.COM"
+    message = "Hello SM2 - 批量验证测试"
+    keys = generate_key_pairs(rounds)
+    items = [(PA, ID, message, sign(d, PA, ID, message)) for d, PA in keys]
+
+    start = time.perf_counter()
+    single = [verify(*item) for item in items]
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = batch_verify(items)
+    batch_time = time.perf_counter() - start
+
+    print(f"逐个验证平均耗时: {single_time / rounds * 1000:.3f} ms")
+    print(f"批量验证平均耗时: {batch_time / rounds * 1000:.3f} ms")
+    print(f"验证结果: {'成功' if all(single) and single == batch else '失败'}")
+
+
+if __name__ == "__main__":
+    benchmark()
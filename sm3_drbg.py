@@ -0,0 +1,173 @@
+import os
+import threading
+import time
+import weakref
+
+from sm3_backend import sm3 as _sm3
+
+SEEDLEN = 440  # SM3输出256比特，按SP 800-90A Hash_DRBG取seedlen = 440比特
+_SEED_BYTES = SEEDLEN // 8
+_SEED_MOD = 1 << SEEDLEN
+RESEED_INTERVAL = 1 << 16  # 每生成这么多次后从os.urandom重新播种
+BUFFER_SIZE = 4096  # 每次generate填充的缓冲区字节数
+MAX_BYTES_PER_REQUEST = 1 << 16  # SP 800-90A：每次generate最多输出2^19比特
+
+
+def _hash_df(data, nbytes):
+    """Hash_df：用计数器扩展SM3输出到nbytes字节"""
+    out = b''
+    counter = 1
+    while len(out) < nbytes:
+        out += _sm3(bytes([counter]) + (nbytes * 8).to_bytes(4, 'big') + data)
+        counter += 1
+    return out[:nbytes]
+
+
+class SM3Drbg:
+    """基于SM3的Hash_DRBG，带输出缓冲
+
+    随机数从进程内缓冲区取出，缓冲区按BUFFER_SIZE批量生成；
+    每RESEED_INTERVAL次generate或检测到fork后自动用os.urandom重新播种。
+    """
+
+    def __init__(self, personalization=b'', buffer_size=BUFFER_SIZE, reseed_interval=RESEED_INTERVAL,
+                 max_bytes_per_request=MAX_BYTES_PER_REQUEST):
+        if not 0 < max_bytes_per_request <= MAX_BYTES_PER_REQUEST:
+            raise ValueError(f"每次generate的输出不能超过{MAX_BYTES_PER_REQUEST}字节")
+        self.buffer_size = min(buffer_size, max_bytes_per_request)
+        self.reseed_interval = reseed_interval
+        self.max_bytes_per_request = max_bytes_per_request
+        self._lock = threading.Lock()
+        self._buffer = bytearray()
+        self._instantiate(personalization)
+        _drbgs.add(self)
+
+    def _instantiate(self, personalization=b''):
+        seed = _hash_df(os.urandom(32) + os.urandom(16) + personalization, _SEED_BYTES)
+        self._set_seed(seed)
+
+    def _set_seed(self, seed):
+        self._V = int.from_bytes(seed, 'big')
+        self._C = int.from_bytes(_hash_df(b'\x00' + seed, _SEED_BYTES), 'big')
+        self.reseed_counter = 1
+        self._pid = os.getpid()
+        self._buffer.clear()
+
+    def reseed(self, additional=b''):
+        with self._lock:
+            V = self._V.to_bytes(_SEED_BYTES, 'big')
+            self._set_seed(_hash_df(b'\x01' + V + os.urandom(32) + additional, _SEED_BYTES))
+
+    def _generate(self, nbytes):
+        """Hash_DRBG generate：输出nbytes（<= max_bytes_per_request）字节并更新内部状态"""
+        if nbytes > self.max_bytes_per_request:
+            raise ValueError("单次generate请求超过2^19比特")
+        if self.reseed_counter > self.reseed_interval or self._pid != os.getpid():
+            V = self._V.to_bytes(_SEED_BYTES, 'big')
+            self._set_seed(_hash_df(b'\x01' + V + os.urandom(32), _SEED_BYTES))
+
+        data = self._V
+        out = bytearray()
+        while len(out) < nbytes:
+            out += _sm3(data.to_bytes(_SEED_BYTES, 'big'))
+            data = (data + 1) % _SEED_MOD
+
+        V = self._V.to_bytes(_SEED_BYTES, 'big')
+        H = int.from_bytes(_sm3(b'\x03' + V), 'big')
+        self._V = (self._V + H + self._C + self.reseed_counter) % _SEED_MOD
+        self.reseed_counter += 1
+        return out[:nbytes]
+
+    def random_bytes(self, nbytes):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._buffer.clear()  # fork后丢弃与父进程相同的缓冲
+            while len(self._buffer) < nbytes:  # 大请求拆成多次generate，每次不超过max_bytes_per_request
+                need = max(self.buffer_size, nbytes - len(self._buffer))
+                self._buffer += self._generate(min(need, self.max_bytes_per_request))
+            out = bytes(self._buffer[:nbytes])
+            del self._buffer[:nbytes]
+            return out
+
+    def randbelow(self, m):
+        """[0, m)内的均匀随机整数（多取64比特再取模，偏差 < 2^-64）"""
+        size = (m.bit_length() + 7) // 8 + 8
+        return int.from_bytes(self.random_bytes(size), 'big') % m
+
+    def randbelow_many(self, m, count):
+        """取出count个[0, m)内的随机整数；按max_bytes_per_request分块取字节，每块对应一次generate"""
+        size = (m.bit_length() + 7) // 8 + 8
+        per_chunk = max(1, self.max_bytes_per_request // size)
+        result = []
+        for start in range(0, count, per_chunk):
+            chunk = min(per_chunk, count - start)
+            data = memoryview(self.random_bytes(size * chunk))
+            result += [int.from_bytes(data[i:i + size], 'big') % m for i in range(0, size * chunk, size)]
+        return result
+
+
+_drbgs = weakref.WeakSet()
+_default = None
+_default_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    """fork后的子进程：锁可能被父进程中的其他线程（如预计算池的补充线程）持有，全部重建；重新播种由pid检查完成"""
+    global _default_lock
+    _default_lock = threading.Lock()
+    for drbg in list(_drbgs):
+        drbg._lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def default_drbg():
+    """进程级默认DRBG"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = SM3Drbg()
+        return _default
+
+
+def random_bytes(nbytes):
+    return default_drbg().random_bytes(nbytes)
+
+
+def randbelow(m):
+    return default_drbg().randbelow(m)
+
+
+def randbelow_many(m, count):
+    return default_drbg().randbelow_many(m, count)
+
+
+def benchmark():
+    from sm2_field import n
+
+    rounds = 20000
+    drbg = SM3Drbg()
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        int.from_bytes(os.urandom(32), 'big') % (n - 1) + 1
+    urandom_time = (time.perf_counter() - start) / rounds * 1e6
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        drbg.randbelow(n - 1) + 1
+    drbg_time = (time.perf_counter() - start) / rounds * 1e6
+
+    start = time.perf_counter()
+    drbg.randbelow_many(n - 1, rounds)
+    bulk_time = (time.perf_counter() - start) / rounds * 1e6
+
+    print(f"os.urandom逐个取标量: {urandom_time:.2f} µs/个")
+    print(f"DRBG逐个取标量: {drbg_time:.2f} µs/个")
+    print(f"DRBG批量取标量: {bulk_time:.2f} µs/个")
+
+
+if __name__ == "__main__":
+    benchmark()